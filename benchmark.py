@@ -0,0 +1,312 @@
+import argparse
+import csv
+import glob
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+from datafly import ALGORITHMS, CsvTable, _positive_int
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows, where the peak memory isn't measured:
+    resource = None
+
+
+_EXAMPLE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'example')
+"""
+Directory of the example tables and generalization files.
+"""
+
+_QI_NAMES = ['age', 'city_birth', 'zip_code']
+"""
+Names of the Quasi Identifiers of the example tables.
+"""
+
+_PHASES = ['load', 'ingest', 'generalization', 'suppression', 'write']
+"""
+Phases of each case: loading of the table and of the DGHs, then the ones of the anonymization.
+"""
+
+_FIELDS = ['table', 'rows', 'algorithm', 'k'] + _PHASES + [
+    'wall', 'rows_per_second', 'classes_before', 'classes_after', 'merges', 'dgh_lookups',
+    'dgh_cache_hits', 'peak_rss_kb']
+"""
+Fields of each record of the report, in the order of the columns of the CSV report.
+"""
+
+_METRICS = ['wall', 'peak_rss_kb']
+"""
+Fields of the records which are compared with the baseline.
+"""
+
+
+def _peak_rss() -> int:
+
+    """
+    Gets the peak resident set size of this process and of its terminated children.
+
+    :return:    The peak resident set size in kilobytes, None if it cannot be measured.
+    """
+
+    if resource is None:
+        return None
+
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    # Note: macOS measures it in bytes instead of kilobytes:
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+def _count_rows(pt_path: str) -> int:
+
+    """
+    Counts the rows of a table, without the header.
+
+    :param pt_path: Path to the table file.
+    :return:        The number of rows.
+    """
+
+    lines = 0
+    with open(pt_path, 'rb') as file:
+        for block in iter(lambda: file.read(1 << 20), b''):
+            lines += block.count(b'\n')
+    return max(lines - 1, 0)
+
+
+def _run_case(pt_path: str, dgh_paths: dict, qi_names: list, k: int, algorithm: str,
+              output_path: str, chunk_size=None, workers=None, memory_map=False) -> dict:
+
+    """
+    Anonymizes a table once, timing each phase. It's run in a new process, so that its peak
+    memory is not affected by the other cases.
+
+    :param pt_path:     Path to the table file.
+    :param dgh_paths:   Dictionary whose keys are the QI attribute names and whose values are the
+                        paths to the corresponding generalization files.
+    :param qi_names:    List of names of the Quasi Identifiers attributes.
+    :param k:           Level of anonymity.
+    :param algorithm:   Name of the generalization algorithm.
+    :param output_path: Path to the output file.
+    :param chunk_size:  If given, the QI sequences are counted in chunks of this number of rows.
+    :param workers:     If given, the table is counted and written by this number of processes.
+    :param memory_map:  If True the table file is memory-mapped.
+    :return:            Dictionary whose keys are the phases and 'wall' (the duration of the
+                        whole case), whose values are their durations in seconds, plus the
+                        counters of the anonymization and the peak resident set size in
+                        kilobytes.
+    :raises KeyError:   If a QI attribute name is not valid, or if a value is not part of the
+                        corresponding domain (then its arguments are the value and the index of
+                        the attribute).
+    """
+
+    # The progress messages are not part of the report:
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+        start = time.perf_counter()
+        table = CsvTable(pt_path, dgh_paths, memory_map)
+        load = time.perf_counter() - start
+
+        stats = table.anonymize(qi_names, k, output_path, v=False, chunk_size=chunk_size,
+                                workers=workers, algorithm=algorithm)
+        del table
+        wall = time.perf_counter() - start
+
+    record = dict(stats.durations, load=load)
+    for phase in _PHASES:
+        record.setdefault(phase, 0)
+    record.update(wall=wall, classes_before=stats.classes_before,
+                  classes_after=stats.classes_after, merges=stats.merges,
+                  dgh_lookups=stats.dgh_lookups, dgh_cache_hits=stats.dgh_cache_hits,
+                  peak_rss_kb=_peak_rss())
+
+    return record
+
+
+def benchmark(pt_paths: list, dgh_paths: dict, qi_names: list, ks: list, algorithms: list,
+              repeat=1, chunk_size=None, workers=None, memory_map=False, v=True) -> list:
+
+    """
+    Anonymizes every table for every algorithm and level of anonymity, each time in a new
+    process.
+
+    :param pt_paths:    List of paths to the table files.
+    :param dgh_paths:   Dictionary whose keys are the QI attribute names and whose values are the
+                        paths to the corresponding generalization files.
+    :param qi_names:    List of names of the Quasi Identifiers attributes.
+    :param ks:          List of levels of anonymity.
+    :param algorithms:  List of names of the generalization algorithms.
+    :param repeat:      Number of runs of each case, of which the fastest one is kept.
+    :param chunk_size:  If given, the QI sequences are counted in chunks of this number of rows.
+    :param workers:     If given, the table is counted and written by this number of processes.
+    :param memory_map:  If True the table files are memory-mapped.
+    :param v:           If True prints each record.
+    :return:            List of the records of the report, one for each case.
+    :raises ValueError: If the number of runs is not positive.
+    """
+
+    if repeat < 1:
+        raise ValueError("The number of runs must be a positive integer.")
+
+    records = list()
+    # Note: a spawned process doesn't share the memory of this one:
+    context = multiprocessing.get_context('spawn')
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        for pt_path in pt_paths:
+            rows = _count_rows(pt_path)
+            output_path = os.path.join(output_dir, os.path.basename(pt_path))
+            for algorithm in algorithms:
+                for k in ks:
+                    runs = list()
+                    for _ in range(repeat):
+                        with ProcessPoolExecutor(1, mp_context=context) as executor:
+                            runs.append(executor.submit(
+                                _run_case, pt_path, dgh_paths, qi_names, k, algorithm,
+                                output_path, chunk_size, workers, memory_map).result())
+
+                    record = min(runs, key=lambda run: run['wall'])
+                    record.update(table=os.path.basename(pt_path), rows=rows,
+                                  algorithm=algorithm, k=k,
+                                  rows_per_second=rows / record['wall'] if record['wall'] else 0)
+                    records.append(record)
+
+                    if v:
+                        print("[LOG] %s (%d rows), %s, k=%d: %.3f s (%s), peak RSS %s kB." %
+                              (record['table'], rows, algorithm, k, record['wall'],
+                               ", ".join("%s %.3f s" % (phase, record[phase])
+                                         for phase in _PHASES),
+                               record['peak_rss_kb']))
+
+    return records
+
+
+def compare(records: list, baseline: list, tolerance=0.25, min_time=0.05) -> list:
+
+    """
+    Compares the records of a report with the ones of the same cases in a baseline report.
+
+    :param records:     List of the records of the report.
+    :param baseline:    List of the records of the baseline report.
+    :param tolerance:   Relative increase of a metric above which it's a regression.
+    :param min_time:    Increase in seconds of the wall time below which it's not a regression
+                        (so that the noise on the smallest tables is ignored).
+    :return:            List of tuples (record, metric, baseline value) of the regressions.
+    """
+
+    # Index of the baseline records by their case:
+    cases = dict(((record['table'], record['algorithm'], record['k']), record)
+                 for record in baseline)
+
+    regressions = list()
+    for record in records:
+        reference = cases.get((record['table'], record['algorithm'], record['k']))
+        if reference is None:
+            continue
+        for metric in _METRICS:
+            value, reference_value = record.get(metric), reference.get(metric)
+            if value is None or not reference_value:
+                continue
+            if metric == 'wall' and value - reference_value < min_time:
+                continue
+            if value > reference_value * (1 + tolerance):
+                regressions.append((record, metric, reference_value))
+
+    return regressions
+
+
+def _default_tables() -> list:
+
+    """
+    Gets the example tables, from the smallest one.
+
+    :return:    List of paths to the table files.
+    """
+
+    pt_paths = [path for path in glob.glob(os.path.join(_EXAMPLE_DIR, 'db_*.csv'))
+                if os.path.basename(path)[3:-4].isdigit()]
+    return sorted(pt_paths, key=lambda path: int(os.path.basename(path)[3:-4]))
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(
+        description="Benchmark of the k-anonymization of tables of increasing size. Records the "
+                    "duration of each phase and the peak memory of each case, and flags the "
+                    "regressions against a baseline report.")
+    parser.add_argument("--private_tables", "-pt", type=str, default=None, nargs='+',
+                        help="Paths to the CSV tables to K-anonymize (default: the example "
+                             "tables).")
+    parser.add_argument("--quasi_identifier", "-qi", type=str, default=_QI_NAMES, nargs='+',
+                        help="Names of the attributes which are Quasi Identifiers (default: the "
+                             "ones of the example tables).")
+    parser.add_argument("--domain_gen_hierarchies", "-dgh", type=str, default=None, nargs='+',
+                        help="Paths to the generalization files (must have same order as the QI "
+                             "name list, default: the example ones).")
+    parser.add_argument("-k", type=_positive_int, default=[2, 5, 10, 50], nargs='+',
+                        help="Values of K.")
+    parser.add_argument("--algorithm", "-a", choices=ALGORITHMS, default=['datafly'],
+                        nargs='+', help="Generalization algorithms.")
+    parser.add_argument("--repeat", "-r", type=_positive_int, default=1,
+                        help="Number of runs of each case, of which the fastest one is kept.")
+    parser.add_argument("--chunk_size", "-c", type=_positive_int, default=None,
+                        help="Stream the tables, counting the QI values in chunks of this number "
+                             "of rows.")
+    parser.add_argument("--workers", "-w", type=_positive_int, default=None,
+                        help="Stream the tables, counting the QI values and writing the rows "
+                             "with this number of processes.")
+    parser.add_argument("--mmap", action="store_true",
+                        help="Memory-map the table files.")
+    parser.add_argument("--output", "-o", type=str, default=None,
+                        help="Path to the JSON report.")
+    parser.add_argument("--csv", type=str, default=None,
+                        help="Path to the CSV report.")
+    parser.add_argument("--baseline", "-b", type=str, default=None,
+                        help="Path to a JSON report to compare with.")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Relative increase of the wall time or of the peak memory above "
+                             "which a case is a regression.")
+    args = parser.parse_args()
+
+    pt_paths = args.private_tables or _default_tables()
+    dgh_paths = dict(zip(args.quasi_identifier, args.domain_gen_hierarchies or [
+        os.path.join(_EXAMPLE_DIR, '%s_generalization.csv' % qi_name)
+        for qi_name in args.quasi_identifier]))
+
+    try:
+        records = benchmark(pt_paths, dgh_paths, args.quasi_identifier, args.k, args.algorithm,
+                            args.repeat, args.chunk_size, args.workers, args.mmap)
+    except KeyError as error:
+        if len(error.args) > 1:
+            print("[ERROR] Value '%s' is not in hierarchy for attribute '%s'."
+                  % (error.args[0], args.quasi_identifier[error.args[1]]))
+        else:
+            print("[ERROR] Quasi Identifier '%s' is not valid." % error.args[0])
+        sys.exit(2)
+    except FileNotFoundError as error:
+        print("[ERROR] File '%s' has not been found." % error.filename)
+        sys.exit(2)
+
+    if args.output is not None:
+        with open(args.output, 'w') as file:
+            json.dump(records, file, indent=2)
+    if args.csv is not None:
+        with open(args.csv, 'w', newline='') as file:
+            writer = csv.DictWriter(file, _FIELDS)
+            writer.writeheader()
+            writer.writerows(records)
+
+    if args.baseline is not None:
+        with open(args.baseline, 'r') as file:
+            regressions = compare(records, json.load(file), args.tolerance)
+        for record, metric, reference_value in regressions:
+            print("[REGRESSION] %s, %s, k=%d: %s is %s (baseline %s)." %
+                  (record['table'], record['algorithm'], record['k'], metric, record[metric],
+                   reference_value))
+        if regressions:
+            sys.exit(1)
+        print("[LOG] No regressions against the baseline.")
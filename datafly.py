@@ -1,18 +1,193 @@
 import argparse
 import csv
-from itertools import count
+import mmap
+import os
+import shutil
+import tempfile
+from array import array
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from itertools import compress, islice
+from operator import itemgetter
 import sys
 from datetime import datetime
 from io import StringIO
 from dgh import CsvDGH
+from engine import Engine, Histograms, Lattice, Mondrian, Plan, Rollup
+from progress import Progress
+from stats import Stats
 
 
-_DEBUG = True
+_DEBUG = False
+"""
+If True the debug messages are printed.
+"""
+
+_BATCH_SIZE = 10000
+"""
+Number of anonymized rows written on the output file at once.
+"""
+
+_BUFFER_SIZE = 1 << 20
+"""
+Size in bytes of the buffer of the output file.
+"""
+
+_ENGINES = {'datafly': Engine, 'lattice': Lattice, 'mondrian': Mondrian}
+"""
+Dictionary whose keys are the names of the generalization algorithms and whose values are the
+classes of the corresponding engines.
+"""
+
+ALGORITHMS = tuple(_ENGINES)
+"""
+Names of the generalization algorithms, which can be passed to CsvTable.anonymize.
+"""
+
+
+def _values_getter(indices: list):
+
+    """
+    Gets a function which returns the values of a row on some columns.
+
+    :param indices: Indices of the columns.
+    :return:        Function whose argument is a row and which returns a tuple of values.
+    """
+
+    if len(indices) == 1:
+        # Note: itemgetter returns a value instead of a tuple for a single index:
+        index = indices[0]
+        return lambda row: (row[index],)
+    return itemgetter(*indices)
+
+
+def _positive_int(text: str) -> int:
+
+    """
+    Parses a command line argument which must be a positive integer.
+
+    :param text:                        Text of the argument.
+    :return:                            The integer.
+    :raises argparse.ArgumentTypeError: If the text is not a positive integer.
+    """
+
+    try:
+        value = int(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError("invalid int value: '%s'" % text)
+    if value < 1:
+        raise argparse.ArgumentTypeError("must be a positive integer: '%s'" % text)
+
+    return value
+
+
+def _check_streaming(chunk_size, workers):
+
+    """
+    Checks the options of the streaming of a table.
+
+    :param chunk_size:  Number of rows of each chunk, or None.
+    :param workers:     Number of worker processes, or None.
+    :raises ValueError: If the chunk size or the number of workers is not positive.
+    """
+
+    # Note: an empty chunk would end the count before the first row:
+    if chunk_size is not None and chunk_size < 1:
+        raise ValueError("The chunk size must be a positive integer.")
+    if workers is not None and workers < 1:
+        raise ValueError("The number of workers must be a positive integer.")
+
+
+def _range_rows(file, start: int, end: int):
+
+    """
+    Reads the rows of a CSV file which start in a range of bytes.
+
+    :param file:    CSV file, opened in binary mode.
+    :param start:   Offset of the first row of the range (the start of a line).
+    :param end:     Offset where the range ends.
+    :return:        Iterator over the rows (lists of values); empty lines are ignored.
+    """
+
+    def lines():
+        position = start
+        for line in file:
+            if position >= end:
+                break
+            position += len(line)
+            yield line.decode()
+
+    file.seek(start)
+    # Note: each row must be on a single line:
+    return filter(None, csv.reader(lines()))
+
+
+def _count_range(pt_path: str, start: int, end: int, indices: list) -> Counter:
+
+    """
+    Counts the occurrences of the sequences of values on some columns, for the rows of a CSV file
+    which start in a range of bytes. Used by the worker processes.
+
+    :param pt_path: Path to the CSV file.
+    :param start:   Offset of the first row of the range (the start of a line).
+    :param end:     Offset where the range ends.
+    :param indices: Indices of the columns.
+    :return:        Counter whose keys are the sequences of values and whose values are their
+                    occurrences.
+    """
+
+    with open(pt_path, 'rb') as file:
+        return Counter(map(_values_getter(indices), _range_rows(file, start, end)))
+
+
+def _generalize_range(pt_path: str, start: int, end: int, indices: list, plan: Plan,
+                      part_path: str) -> int:
+
+    """
+    Generalizes the rows of a CSV file which start in a range of bytes, writing them on a new
+    part file without the suppressed ones. Used by the worker processes.
+
+    :param pt_path:     Path to the CSV file.
+    :param start:       Offset of the first row of the range (the start of a line).
+    :param end:         Offset where the range ends.
+    :param indices:     Indices of the Quasi Identifier columns.
+    :param plan:        Plan to apply to the rows.
+    :param part_path:   Path to the part file.
+    :return:            Couple (number of rows written, number of rows suppressed).
+    """
+
+    get_qi = _values_getter(indices)
+    written, suppressed = 0, 0
+
+    with open(pt_path, 'rb') as file, \
+            open(part_path, 'w', newline='', buffering=_BUFFER_SIZE) as part:
+        csv_writer = csv.writer(part)
+        batch = list()
+
+        for row in _range_rows(file, start, end):
+            qi_sequence = plan.generalize(get_qi(row))
+            # Skip the row if it's suppressed:
+            if qi_sequence is None:
+                suppressed += 1
+                continue
+            for index, value in zip(indices, qi_sequence):
+                row[index] = value
+            batch.append(row)
+
+            if len(batch) == _BATCH_SIZE:
+                csv_writer.writerows(batch)
+                written += len(batch)
+                batch = list()
+
+        csv_writer.writerows(batch)
+        written += len(batch)
+
+    return written, suppressed
 
 
 class _Table:
 
-    def __init__(self, pt_path: str, dgh_paths: dict):
+    def __init__(self, pt_path: str, dgh_paths: dict, memory_map=False, dgh_cache=None):
 
         """
         Instantiates a table and the specified Domain Generalization Hierarchies from the
@@ -21,6 +196,11 @@ class _Table:
         :param pt_path:             Path to the table to anonymize.
         :param dgh_paths:           Dictionary whose values are paths to DGH files and whose keys
                                     are the corresponding attribute names.
+        :param memory_map:          If True the table file is memory-mapped, and the rows to write
+                                    are read back through their offsets.
+        :param dgh_cache:           Directory of the compiled DGH files, which are loaded instead
+                                    of parsing the DGH files when these haven't changed. If None
+                                    the DGH files are always parsed.
         :raises IOError:            If a file cannot be read.
         :raises FileNotFoundError:  If a file cannot be found.
         """
@@ -29,6 +209,27 @@ class _Table:
         """
         Reference to the table file.
         """
+        self.mapped = None
+        """
+        Memory map of the table file, None if it's not memory-mapped.
+        """
+        self.offsets = array('q')
+        """
+        Array containing the offset in the memory map of every row which is not ignored, filled
+        while reading the table.
+        """
+        self.memory_map = memory_map
+        """
+        If True the table file is memory-mapped.
+        """
+        self.pt_path = pt_path
+        """
+        Path to the table file.
+        """
+        self.dgh_cache = dgh_cache
+        """
+        Directory of the compiled DGH files, None if they are not used.
+        """
         self.attributes = dict()
         """
         Dictionary whose keys are the table attributes names and whose values are the corresponding
@@ -52,17 +253,12 @@ class _Table:
         Closes the table file.
         """
 
+        if self.mapped is not None:
+            self.mapped.close()
         self.table.close()
 
-    def compute_count(self, freq, k):
-            count=0
-            for currTup in freq.values():
-                if currTup[1] < k:
-                    count += currTup[1]
-
-            return count
-
-    def anonymize(self, qi_names: list, k: int, output_path: str, v=True):
+    def anonymize(self, qi_names: list, k: int, output_path: str, v=True, chunk_size=None,
+                  workers=None, algorithm='datafly', plan=None, stats=None) -> Stats:
 
         """
         Writes a k-anonymous representation of this table on a new file. The maximum number of
@@ -72,195 +268,360 @@ class _Table:
                             k-anonymization.
         :param k:           Level of anonymity.
         :param output_path: Path to the output file.
-        :param v:           If True prints some logging.
-        :raises KeyError:   If a QI attribute name is not valid.
+        :param v:           If True prints some logging, and the progress of the reading and of
+                            the writing of the table.
+        :param chunk_size:  If given, the table is streamed: the QI sequences are counted in
+                            chunks of this number of rows, the generalization is computed from
+                            their counts only and the rows are generalized while reading the table
+                            again. Memory then depends on the number of distinct sequences instead
+                            of the number of rows.
+        :param workers:     If given, the table is streamed as with chunk_size, but the QI
+                            sequences are counted and then the rows are generalized by this number
+                            of processes, each one on a range of the table file.
+        :param algorithm:   Name of the generalization algorithm: 'datafly' for the Datafly
+                            heuristic, 'lattice' for the search of the k-anonymous levels of
+                            generalization with the minimal loss, 'mondrian' for the partitioning
+                            of the QI sequences (where the QIs without a DGH are numeric). The
+                            last two only need the counts of the QI sequences.
+        :param plan:        If given, the generalization computed beforehand (e.g. by a sweep),
+                            and the table is only read to write it.
+        :param stats:       Metrics where to record the anonymization (e.g. the ones recorded
+                            while computing the given plan); if None new ones are created.
+        :return:            The metrics of the anonymization.
+        :raises KeyError:   If a QI attribute name is not valid, or if a value is not part of the
+                            corresponding domain (then its arguments are the value and the index
+                            of the attribute).
+        :raises ValueError: If the chunk size or the number of workers is not positive.
         :raises IOError:    If the output file cannot be written.
         """
 
-        global _DEBUG
+        _check_streaming(chunk_size, workers)
 
-        if v:
-            _DEBUG = False
-
-        self._debug("[DEBUG] Creating the output file...", _DEBUG)
+        self._debug("[DEBUG] Creating the output file...")
         try:
-            output = open(output_path, 'w')
+            output = open(output_path, 'w', newline='', buffering=_BUFFER_SIZE)
         except IOError:
             raise
         self._log("[LOG] Created output file.", endl=True, enabled=v)
 
-        # Start reading the table file from the top:
-        self.table.seek(0)
-
-        self._debug("[DEBUG] Instantiating the QI frequency dictionary...", _DEBUG)
-        # Dictionary whose keys are sequences of values for the Quasi Identifiers and whose values
-        # are couples (n, s) where n is the number of occurrences of a sequence and s is a set
-        # containing the indices of the rows in the original table file with those QI values:
-        qi_frequency = dict()
-
-        self._debug("[DEBUG] Instantiating the attributes domains dictionary...", _DEBUG)
-        domains = dict()
-        for i, attribute in enumerate(qi_names):
-            domains[i] = set()
-
-        # Dictionary whose keys are the indices in the QI attribute names list, and whose values are
-        # the current levels of generalization, from 0 (not generalized):
-        gen_levels = dict()
-        for i, attribute in enumerate(qi_names):
-            gen_levels[i] = 0
-
-
-        # 1. build a frequency dict freq with quasi identifier where
-        # key = distinct values of PT[QI]
-        # value = number of occurrences of each combination of values        
-        for idx, row in enumerate(self.table):
-            qi_sequence = self._get_values(row, list(qi_names), idx)
-            if not qi_sequence: continue
-            if tuple(qi_sequence) in qi_frequency:
-                currTup = qi_frequency[tuple(qi_sequence)]
-                currList = currTup[0]
-                currList.append(idx)
-                qi_frequency[tuple(qi_sequence)] = tuple([currList, currTup[1]+1])
+        if stats is None:
+            stats = Stats(k, algorithm)
 
+        # 1. compute the generalization, from the QI sequences of every row (or only from their
+        # counts when streaming):
+        engine = None
+        try:
+            if plan is not None:
+                pass
+            elif chunk_size is None and workers is None and _ENGINES[algorithm] is Engine:
+                self._debug("[DEBUG] Instantiating the encoded equivalence classes...")
+                # Integer-encoded equivalence classes of the Quasi Identifiers, with the index of
+                # the class of each row:
+                with stats.phase('ingest'):
+                    engine = Engine([self.dghs[attribute] for attribute in qi_names], k)
+                    progress = Progress("Reading the table", enabled=v)
+                    for qi_sequence in progress.track(self._read_rows(qi_names)):
+                        engine.add_row(qi_sequence)
+                stats.rows = len(engine)
+                plan = engine.plan(stats)
             else:
-                qi_frequency[tuple(qi_sequence)] = tuple([[idx], 1])
-                # Update domain set for each attribute in this sequence:
-                for j, value in enumerate(qi_sequence):
-                    domains[j].add(value)
-                
-        self._debug("[DEBUG] domains is: " + str(domains), _DEBUG)
-        self._debug("[DEBUG] gen_levels is: " + str(gen_levels), _DEBUG)
-        self._debug("[DEBUG] Dictionary is: " + str(qi_frequency), _DEBUG)
-        
-        # 2. considering all rows and their values, if there's a value < k add it to count
-        # and if count > k i have to go on
-        while self.compute_count(qi_frequency, k) > k:  
-            self._debug("[DEBUG] compute_count is: " + str(self.compute_count(qi_frequency, k)), _DEBUG)
-
-            # Get the attribute whose domain has the max cardinality:
-            max_cardinality, max_attribute_idx = 0, None
-
-            for attribute_idx in domains:
-                if len(domains[attribute_idx]) > max_cardinality:
-                    max_cardinality = len(domains[attribute_idx])
-                    max_attribute_idx = attribute_idx
-
-            # Index of the attribute to generalize:
-            attribute_idx = max_attribute_idx
-            self._debug("[DEBUG] Attribute to generalize is: " + str(attribute_idx), _DEBUG)
-
-            # Generalize each value for that attribute and update the attribute set in the domains dictionary:
-            domains[attribute_idx] = set()
-            # Look up table for the generalized values, to avoid searching in hierarchies:
-            generalizations = dict()
-
-            # Note: using the list of keys since the dictionary is changed in size at runtime
-            # and it can't be used an iterator:
-            for j, qi_sequence in enumerate(list(qi_frequency)):
-
-                # Get the generalized value:
-                if qi_sequence[attribute_idx] in generalizations:
-                    # Find directly the generalized value in the look up table:
-                    generalized_value = generalizations[attribute_idx]
-                else:
-                    # Get the corresponding generalized value from the attribute DGH:
-                    try:
-                        generalized_value = self.dghs[qi_names[attribute_idx]].generalize(qi_sequence[attribute_idx],gen_levels[attribute_idx]) 
-                    except KeyError as error:
-                        output.close()
-                        return
-
-                    # Skip if it's a hierarchy root:    
-                    if generalized_value is None: continue
-
-                    # Add to the look up table:
-                    generalizations[attribute_idx] = generalized_value
-
-                # Update the tuples with generalized value
-                new_qi_sequence = list(qi_sequence)
-                new_qi_sequence[attribute_idx] = generalized_value
-                new_qi_sequence = tuple(new_qi_sequence)
-                
-                # Check if there is already a tuple like this one and update it
-                if new_qi_sequence in qi_frequency:
-                    occurrences = qi_frequency[new_qi_sequence][1] + qi_frequency[qi_sequence][1]
-
-                    rows_set = set(qi_frequency[new_qi_sequence][0]).union(set(qi_frequency[qi_sequence][0]))
-                    qi_frequency[new_qi_sequence] = (list(rows_set), occurrences)
-                    
-                    # Remove the old sequence:
-                    qi_frequency.pop(qi_sequence)
-                
+                plan = self.plan(qi_names, k, chunk_size, workers, algorithm, stats, v)
+        except KeyError:
+            output.close()
+            raise
+
+        self._debug("[DEBUG] gen_levels is: %s", plan.gen_levels)
+        if plan.loss is not None and plan.gen_levels is not None:
+            self._log("[LOG] Generalization levels %s have the minimal loss %d.",
+                      plan.gen_levels, plan.loss, endl=True, enabled=v)
+        elif plan.loss is not None:
+            self._log("[LOG] Partitions have the loss %d.", plan.loss, endl=True, enabled=v)
+        self._debug("[DEBUG] %d sequences are suppressed.", len(plan.suppressed))
+
+        # 2. updating and publishing the anonymized table, without the tuples which occur less
+        # than k times:
+        lookups = plan.lookups
+        with stats.phase('write'):
+            if workers is not None:
+                # Each worker generalizes a part of the table:
+                written, suppressed = self._write_parallel(output, plan, qi_names, workers)
+                self._log("[LOG] Wrote %d rows with %d workers.", written, workers, endl=True,
+                          enabled=v)
+            else:
+                write_rows = self._writer(output)
+                batch = list()
+                written, suppressed = 0, 0
+
+                if engine is not None:
+                    # Each row is written from the sequence of its equivalence class:
+                    row_classes = engine.resolve()
+                    # Flags telling whether each row is written (i.e. it's not suppressed):
+                    selectors = bytes(map(k.__le__, map(engine.counts.__getitem__, row_classes)))
+                    sequences = dict((root, engine.decode(root)) for root in engine.roots)
+                    table_rows = zip(map(sequences.__getitem__, compress(row_classes, selectors)),
+                                     self._read_rows(selectors=selectors))
+                    # Note: the suppressed rows are not even read:
+                    suppressed = len(row_classes) - sum(selectors)
+                    progress = Progress("Writing the table", len(row_classes) - suppressed,
+                                        enabled=v)
                 else:
-                    # Add new tuple and remove the old one:
-                    qi_frequency[new_qi_sequence] = qi_frequency.pop(qi_sequence)
+                    # Each row is generalized from its QI values:
+                    get_qi = _values_getter([self.attributes[attribute]
+                                             for attribute in qi_names])
+                    table_rows = ((plan.generalize(get_qi(table_row)), table_row)
+                                  for table_row in self._read_rows())
+                    progress = Progress("Writing the table", stats.rows or None, enabled=v)
+
+                for qi_sequence, table_row in progress.track(table_rows):
+                    # Skip the row if it's suppressed:
+                    if qi_sequence is None:
+                        suppressed += 1
+                        continue
+                    batch.append(self._set_values(table_row, qi_sequence, qi_names))
+
+                    if len(batch) == _BATCH_SIZE:
+                        write_rows(batch)
+                        written += len(batch)
+                        batch = list()
+
+                write_rows(batch)
+                written += len(batch)
 
-                # Update domain set with this attribute value:
-                domains[attribute_idx].add(qi_sequence[attribute_idx])
+        output.close()
 
-            # Update current level of generalization:
-            gen_levels[attribute_idx] += 1
+        stats.rows = written + suppressed
+        stats.rows_written, stats.rows_suppressed = written, suppressed
+        stats.dgh_lookups += plan.lookups - lookups
+        # The rows written from their equivalence classes are not generalized again, and every
+        # other value is generalized from the look up tables of the plan, unless it has been
+        # generalized through the DGHs to fill them (beforehand for the workers):
+        generalized = 0 if engine is not None else stats.rows * len(qi_names)
+        misses = plan.lookups - lookups if workers is None else 0
+        stats.dgh_cache_hits += generalized - misses
 
+        self._log("[LOG] All done.", endl=True, enabled=v)
 
-        # 3. delete rows with occurences less than k
-        # Drop tuples which occur less than k times:
-        toRem = set()
-        for qi_sequence, data in qi_frequency.items():
-            if data[1] < k:
-                toRem.add(qi_sequence)
+        return stats
 
-        while toRem:
-            elem = toRem.pop()
-            del qi_frequency[elem]
-            
+    
 
-        # 4. Updating and publishing the anonymized table
-        self.table.seek(0)
+    def plan(self, qi_names: list, k: int, chunk_size=None, workers=None,
+             algorithm='datafly', stats=None, v=False) -> Plan:
 
-        for i, row in enumerate(self.table):
-            table_row = self._get_values(row, list(self.attributes), i)
-            if table_row is None: continue
+        """
+        Computes the generalization of this table from the counts of its QI sequences only,
+        without writing anything.
 
-            # Find sequence corresponding to this row index:
-            for qi_sequence in qi_frequency:
-                if i in qi_frequency[qi_sequence][0]:
-                    line = self._set_values(table_row, qi_sequence, qi_names)
-                    print(line, file=output, end="")
+        :param qi_names:    List of names of the Quasi Identifiers attributes to consider during
+                            k-anonymization.
+        :param k:           Level of anonymity.
+        :param chunk_size:  If given, the QI sequences are counted in chunks of this number of
+                            rows.
+        :param workers:     If given, the QI sequences are counted by this number of processes
+                            (then chunk_size is ignored).
+        :param algorithm:   Name of the generalization algorithm.
+        :param stats:       Metrics where to record the ingest of the QI sequences and the
+                            generalization, if given.
+        :param v:           If True prints the progress of the reading of the table.
+        :return:            The plan with the levels of generalization and the sequences to
+                            suppress.
+        :raises KeyError:   If a QI attribute name is not valid, or if a value is not part of the
+                            corresponding domain (then its arguments are the value and the index
+                            of the attribute).
+        :raises ValueError: If the chunk size or the number of workers is not positive.
+        """
 
-        output.close()
+        _check_streaming(chunk_size, workers)
+        if stats is None:
+            stats = Stats(k, algorithm)
 
-        self._log("[LOG] All done.", endl=True, enabled=v)
+        engine = _ENGINES[algorithm](self._qi_dghs(qi_names, algorithm), k)
+        with stats.phase('ingest'):
+            stats.rows = self._add_sequences(engine, qi_names, chunk_size, workers, v)
 
-    
+        return engine.plan(stats)
 
-    @staticmethod
-    def _log(content, enabled=True, endl=True):
+    def sweep(self, qi_names: list, ks: list, chunk_size=None, workers=None,
+              algorithm='datafly', stats=None) -> dict:
 
         """
-        Prints a log message.
+        Computes the generalizations of this table for several levels of anonymity, counting its
+        QI sequences only once. The Datafly heuristic and the lattice search evaluate the levels
+        of generalization on histograms which are rolled up once and shared by every k.
 
-        :param content: Content of the message.
-        :param enabled: If False the message is not printed.
+        :param qi_names:    List of names of the Quasi Identifiers attributes to consider during
+                            k-anonymization.
+        :param ks:          List of levels of anonymity.
+        :param chunk_size:  If given, the QI sequences are counted in chunks of this number of
+                            rows.
+        :param workers:     If given, the QI sequences are counted by this number of processes
+                            (then chunk_size is ignored).
+        :param algorithm:   Name of the generalization algorithm.
+        :param stats:       If given, dictionary where to put the metrics of each level of
+                            anonymity, whose keys are the levels: the ingest of the QI sequences
+                            (shared by every level), the generalization and the suppression.
+        :return:            Dictionary whose keys are the levels of anonymity and whose values are
+                            the corresponding plans.
+        :raises KeyError:   If a QI attribute name is not valid, or if a value is not part of the
+                            corresponding domain (then its arguments are the value and the index
+                            of the attribute).
+        :raises ValueError: If the chunk size or the number of workers is not positive.
         """
 
-        if enabled:
-            if endl:
-                print(content)
+        _check_streaming(chunk_size, workers)
+        dghs = self._qi_dghs(qi_names, algorithm)
+        plans = dict()
+        if stats is None:
+            stats = dict()
+
+        if _ENGINES[algorithm] is Mondrian:
+            # The partitions depend on k, but the sequences don't:
+            engine = Mondrian(dghs, ks[0])
+        else:
+            engine = Histograms(dghs)
+        ingest = Stats()
+        with ingest.phase('ingest'):
+            ingest.rows = self._add_sequences(engine, qi_names, chunk_size, workers)
+
+        for k in ks:
+            stats[k] = Stats(k, algorithm)
+            stats[k].durations['ingest'], stats[k].rows = ingest.durations['ingest'], ingest.rows
+            if _ENGINES[algorithm] is Mondrian:
+                engine.k = k
+                plans[k] = engine.plan(stats[k])
+            elif _ENGINES[algorithm] is Engine:
+                # The Datafly heuristic is evaluated on the histograms instead of the rows:
+                plans[k] = Rollup(dghs, k, engine).plan(stats[k])
             else:
-                sys.stdout.write('\r' + content)
+                plans[k] = _ENGINES[algorithm](dghs, k, engine).plan(stats[k])
+        if _ENGINES[algorithm] is not Mondrian:
+            self._debug("[DEBUG] %d histograms rolled up.", engine.rollups)
+
+        return plans
+
+    def _qi_dghs(self, qi_names: list, algorithm: str) -> list:
+
+        """
+        Gets the DGHs of the Quasi Identifiers.
+
+        :param qi_names:    List of names of the Quasi Identifiers attributes.
+        :param algorithm:   Name of the generalization algorithm.
+        :return:            List of DGH instances, one for each Quasi Identifier attribute (None
+                            for the numeric ones, only with the Mondrian algorithm).
+        :raises KeyError:   If a Quasi Identifier has no DGH.
+        """
+
+        if _ENGINES[algorithm] is Mondrian:
+            # The QIs without a DGH are partitioned as numeric:
+            return [self.dghs.get(attribute) for attribute in qi_names]
+        return [self.dghs[attribute] for attribute in qi_names]
+
+    def _add_sequences(self, engine, qi_names: list, chunk_size=None, workers=None,
+                       v=False) -> int:
+
+        """
+        Counts the QI sequences of this table and adds them to an engine.
+
+        :param engine:      Engine, lattice, partitioning or histograms where to add the sequences.
+        :param qi_names:    List of names of the Quasi Identifiers attributes.
+        :param chunk_size:  If given, the QI sequences are counted in chunks of this number of
+                            rows.
+        :param workers:     If given, the QI sequences are counted by this number of processes
+                            (then chunk_size is ignored).
+        :param v:           If True prints the progress of the reading of the table (not with
+                            the worker processes).
+        :return:            Number of rows counted.
+        :raises KeyError:   If a QI attribute name is not valid, or if a value is not part of the
+                            corresponding domain.
+        """
+
+        if workers is not None:
+            counts = self._count_parallel(qi_names, workers)
+        elif chunk_size is None:
+            counts = Counter(Progress("Reading the table", enabled=v).track(
+                self._read_rows(qi_names)))
+        else:
+            return self._count_sequences(engine, Progress("Reading the table", enabled=v).track(
+                self._read_rows(qi_names)), chunk_size)
+
+        for qi_sequence, count in counts.items():
+            engine.add_sequence(qi_sequence, count)
+        return sum(counts.values())
+
+    @staticmethod
+    def _count_sequences(engine, qi_sequences, chunk_size: int) -> int:
+
+        """
+        Counts the occurrences of each QI sequence, one chunk of rows at a time. The partial counts
+        of each chunk are spilled on a temporary file, then all of them are added to the engine.
+
+        :param engine:          Engine, lattice, partitioning or histograms where to add the
+                                sequences.
+        :param qi_sequences:    Iterator over the QI sequences of the rows.
+        :param chunk_size:      Number of rows of each chunk.
+        :return:                Number of rows counted.
+        :raises KeyError:       If a value is not part of the corresponding domain.
+        :raises IOError:        If a temporary file cannot be written or read.
+        """
+
+        with tempfile.TemporaryDirectory() as spill_dir:
+
+            spill_paths = list()
+            while True:
+                # Partial counts of the sequences of this chunk:
+                chunk = Counter(islice(qi_sequences, chunk_size))
+                if not chunk:
+                    break
+
+                spill_path = os.path.join(spill_dir, "%d.csv" % len(spill_paths))
+                with open(spill_path, 'w', newline='') as spill:
+                    csv.writer(spill).writerows(
+                        (count,) + qi_sequence for qi_sequence, count in chunk.items())
+                spill_paths.append(spill_path)
+
+            # Merge the partial counts:
+            rows = 0
+            for spill_path in spill_paths:
+                with open(spill_path, newline='') as spill:
+                    for values in csv.reader(spill):
+                        engine.add_sequence(values[1:], int(values[0]))
+                        rows += int(values[0])
+
+        return rows
 
     @staticmethod
-    def _debug(content, enabled=False):
+    def _log(content, *args, enabled=True, endl=True):
 
         """
-        Prints a debug message.
+        Prints a log message. It's formatted only if it's printed.
 
-        :param content: Content of the message.
+        :param content: Content of the message, with a format specifier for each argument.
+        :param args:    Arguments of the message.
         :param enabled: If False the message is not printed.
+        :param endl:    If False the message replaces the current line instead of ending it.
         """
 
-        if enabled:
+        if not enabled:
+            return
+        if args:
+            content = content % args
+        if endl:
             print(content)
+        else:
+            sys.stdout.write('\r' + content)
+
+    @staticmethod
+    def _debug(content, *args):
+
+        """
+        Prints a debug message if debugging is enabled. It's formatted only if it's printed.
+
+        :param content: Content of the message, with a format specifier for each argument.
+        :param args:    Arguments of the message.
+        """
+
+        if _DEBUG:
+            print(content % args if args else content)
 
     def _init_table(self, pt_path: str):
 
@@ -273,36 +634,83 @@ class _Table:
         """
 
         try:
-            self.table = open(pt_path, 'r')
+            if self.memory_map:
+                self.table = open(pt_path, 'rb')
+                self.mapped = mmap.mmap(self.table.fileno(), 0, access=mmap.ACCESS_READ)
+            else:
+                self.table = open(pt_path, 'r', newline='')
         except FileNotFoundError:
             raise
 
-    def _get_values(self, row: str, attributes: list, row_index=None):
+    def _read_rows(self, attributes=None, selectors=None):
+
+        """
+        Reads the rows of the table file from the top, in a single pass.
+
+        :param attributes:  Names of the attributes to get the data of; if None the whole rows are
+                            read.
+        :param selectors:   Iterable with a flag for each row which must not be ignored, telling
+                            whether to read it; if None every row is read.
+        :return:            Iterator over the rows which must not be ignored: each one is a tuple
+                            of the values of the given attributes, or a list of all its values.
+        :raises KeyError:   If an attribute name is not valid.
+        :raises IOError:    If the file cannot be read.
+        """
+
+        pass
+
+    def _count_parallel(self, attributes: list, workers: int) -> Counter:
 
         """
-        Gets the values corresponding to the given attributes from a row.
+        Counts the occurrences of the sequences of values of some attributes, splitting the table
+        among worker processes.
 
-        :param row:         Line of the table file.
-        :param attributes:  Names of the attributes to get the data of.
-        :param row_index:   Index of the row in the table file.
-        :return:            List of corresponding values if valid, None if this row must be ignored.
+        :param attributes:  Names of the attributes.
+        :param workers:     Number of worker processes.
+        :return:            Counter whose keys are the sequences of values and whose values are
+                            their occurrences.
         :raises KeyError:   If an attribute name is not valid.
-        :raises IOError:    If the row cannot be read.
+        :raises IOError:    If the file cannot be read.
         """
 
-        # Ignore empty lines:
-        if row.strip() == '':
-            return None
+        pass
 
-    def _set_values(self, row, values, attributes: list) -> str:
+    def _write_parallel(self, output, plan: Plan, qi_names: list, workers: int) -> tuple:
 
         """
-        Sets the values of a row for the given attributes and returns the row as a formatted string.
+        Generalizes the rows of the table and writes them on an output file, splitting the table
+        among worker processes. The original order of the rows is kept.
+
+        :param output:      Output file.
+        :param plan:        Plan to apply to the rows.
+        :param qi_names:    List of names of the Quasi Identifiers attributes of the plan.
+        :param workers:     Number of worker processes.
+        :return:            Couple (number of rows written, number of rows suppressed).
+        :raises IOError:    If a file cannot be read or written.
+        """
+
+        pass
+
+    def _set_values(self, row, values, attributes: list) -> list:
+
+        """
+        Sets the values of a row for the given attributes.
 
         :param row:         List of values of the row.
         :param values:      Values to set.
         :param attributes:  Names of the attributes to set.
-        :return:            The new row as a formatted string.
+        :return:            The new row.
+        """
+
+        pass
+
+    def _writer(self, output):
+
+        """
+        Gets a writer of rows on an output file, which formats and writes a batch of rows at once.
+
+        :param output:  Output file.
+        :return:        Function whose argument is a list of rows to write.
         """
 
         pass
@@ -323,17 +731,19 @@ class _Table:
 
 class CsvTable(_Table):
 
-    def __init__(self, pt_path: str, dgh_paths: dict):
+    def __init__(self, pt_path: str, dgh_paths: dict, memory_map=False, dgh_cache=None):
 
-        super().__init__(pt_path, dgh_paths)
+        super().__init__(pt_path, dgh_paths, memory_map, dgh_cache)
 
     def __del__(self):
 
         super().__del__()
 
-    def anonymize(self, qi_names, k, output_path, v=False):
+    def anonymize(self, qi_names, k, output_path, v=False, chunk_size=None, workers=None,
+                  algorithm='datafly', plan=None, stats=None) -> Stats:
 
-        super().anonymize(qi_names, k, output_path, v)
+        return super().anonymize(qi_names, k, output_path, v, chunk_size, workers, algorithm,
+                                 plan, stats)
 
     def _init_table(self, pt_path):
 
@@ -341,7 +751,10 @@ class CsvTable(_Table):
 
         try:
             # Try to read the first line (which contains the attribute names):
-            csv_reader = csv.reader(StringIO(next(self.table)))
+            if self.mapped is not None:
+                csv_reader = csv.reader(StringIO(self.mapped.readline().decode()))
+            else:
+                csv_reader = csv.reader(StringIO(next(self.table)))
         except IOError:
             raise
 
@@ -349,45 +762,155 @@ class CsvTable(_Table):
         for i, attribute in enumerate(next(csv_reader)):
             self.attributes[attribute] = i
 
-    def _get_values(self, row: str, attributes: list, row_index=None):
+    def _read_rows(self, attributes=None, selectors=None):
+
+        super()._read_rows(attributes, selectors)
 
-        super()._get_values(row, attributes, row_index)
+        if self.mapped is not None:
+            if selectors is None:
+                lines = self._index_lines()
+            else:
+                lines = map(self._get_line, compress(range(len(self.offsets)), selectors))
+            # Note: with a memory-mapped table each row must be on a single line:
+            rows = csv.reader(lines)
+        else:
+            self.table.seek(0)
+            # Note: a single reader parses the whole file, instead of one for each line:
+            csv_reader = csv.reader(self.table)
+            # Ignore the first line (which contains the attribute names):
+            next(csv_reader, None)
+            # Ignore empty lines:
+            rows = filter(None, csv_reader)
+            if selectors is not None:
+                rows = compress(rows, selectors)
+
+        if attributes is None:
+            return rows
+
+        indices = [self.attributes[attribute] for attribute in attributes]
+        return map(_values_getter(indices), rows)
+
+    def _count_parallel(self, attributes: list, workers: int) -> Counter:
+
+        super()._count_parallel(attributes, workers)
+
+        indices = [self.attributes[attribute] for attribute in attributes]
+        bounds = self._split(workers)
+
+        counts = Counter()
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            partial_counts = executor.map(_count_range, [self.pt_path] * workers, bounds[:-1],
+                                          bounds[1:], [indices] * workers)
+            # Merge the partial counts:
+            for partial_count in partial_counts:
+                counts.update(partial_count)
+
+        return counts
+
+    def _write_parallel(self, output, plan: Plan, qi_names: list, workers: int) -> tuple:
+
+        super()._write_parallel(output, plan, qi_names, workers)
+
+        indices = [self.attributes[attribute] for attribute in qi_names]
+        bounds = self._split(workers)
+        # Note: the DGHs are not sent to the workers, only the look up tables of the plan:
+        plan = plan.detach()
+
+        with tempfile.TemporaryDirectory() as parts_dir:
+            part_paths = [os.path.join(parts_dir, "%d.csv" % i) for i in range(workers)]
+
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                # Wait for every part to be written:
+                written, suppressed = map(sum, zip(*executor.map(
+                    _generalize_range, [self.pt_path] * workers, bounds[:-1], bounds[1:],
+                    [indices] * workers, [plan] * workers, part_paths)))
+
+            # Concatenate the parts in order:
+            for part_path in part_paths:
+                with open(part_path, 'r', newline='') as part:
+                    shutil.copyfileobj(part, output, _BUFFER_SIZE)
+
+        return written, suppressed
+
+    def _split(self, parts: int) -> list:
+
+        """
+        Splits the rows of the table file (after the first line) in ranges of bytes aligned on the
+        start of the lines.
+
+        :param parts:       Number of ranges.
+        :return:            List of the offsets where the ranges start, followed by the file size.
+        :raises IOError:    If the file cannot be read.
+        """
+
+        with open(self.pt_path, 'rb') as file:
+            start = len(file.readline())
+            size = os.fstat(file.fileno()).st_size
+            bounds = [start]
+            for i in range(1, parts):
+                file.seek(max(start + (size - start) * i // parts - 1, bounds[-1]))
+                # Move to the start of the next line:
+                file.readline()
+                bounds.append(file.tell())
+            bounds.append(size)
 
+        return bounds
+
+    def _index_lines(self):
+
+        """
+        Reads the lines of the memory-mapped table file from the top, recording the offset of each
+        one which is not ignored.
+
+        :return:    Iterator over the lines which must not be ignored.
+        """
+
+        self.offsets = array('q')
+        self.mapped.seek(0)
         # Ignore the first line (which contains the attribute names):
-        if row_index is not None and row_index == 0:
-            return None
+        offset = len(self.mapped.readline())
 
-        # Try to parse the row:
-        try:
-            csv_reader = csv.reader(StringIO(row))
-        except IOError:
-            raise
-        parsed_row = next(csv_reader)
+        for line in iter(self.mapped.readline, b''):
+            # Ignore empty lines:
+            if line.strip():
+                self.offsets.append(offset)
+                yield line.decode()
+            offset += len(line)
 
-        values = list()
-        for attribute in attributes:
-            if attribute in self.attributes:
-                values.append(parsed_row[self.attributes[attribute]])
-            else:
-                raise KeyError(attribute)
+    def _get_line(self, row_idx: int) -> str:
 
-        return values
+        """
+        Gets a line of the memory-mapped table file, given the index of its row.
+
+        :param row_idx: Index of the row among the ones which are not ignored.
+        :return:        The line.
+        """
+
+        start = self.offsets[row_idx]
+        end = self.mapped.find(b'\n', start)
+        if end == -1:
+            end = len(self.mapped)
+
+        return self.mapped[start:end].decode()
 
     def _set_values(self, row: list, values, attributes: list):
 
         for i, attribute in enumerate(attributes):
             row[self.attributes[attribute]] = values[i]
 
-        values = StringIO()
-        csv_writer = csv.writer(values)
-        csv_writer.writerow(row)
+        return row
+
+    def _writer(self, output):
 
-        return values.getvalue()
+        super()._writer(output)
+
+        # Note: the same writer is used for every batch:
+        return csv.writer(output).writerows
 
     def _add_dgh(self, dgh_path, attribute):
 
         try:
-            self.dghs[attribute] = CsvDGH(dgh_path)
+            self.dghs[attribute] = CsvDGH(dgh_path, self.dgh_cache)
         except FileNotFoundError:
             raise
         except IOError:
@@ -406,38 +929,95 @@ if __name__ == "__main__":
                         nargs='+')
     parser.add_argument("--domain_gen_hierarchies", "-dgh", required=True,
                         type=str, help="Paths to the generalization files (must have same order as "
-                                       "the QI name list.",
+                                       "the QI name list, skipping the numeric QIs.",
                         nargs='+')
     parser.add_argument("-k", required=True,
-                        type=int, help="Value of K.")
+                        type=int, help="Value of K. If more values are given, the QI values are "
+                                       "counted once and an output file is written for each "
+                                       "one, named after the output path with a _k<K> suffix.",
+                        nargs='+')
     parser.add_argument("--output", "-o", required=True,
                         type=str, help="Path to the output file.")
+    parser.add_argument("--mmap", action="store_true",
+                        help="Memory-map the table file and read back only the rows to write.")
+    parser.add_argument("--chunk_size", "-c", type=_positive_int, default=None,
+                        help="Stream the table, counting the QI values in chunks of this number "
+                             "of rows.")
+    parser.add_argument("--workers", "-w", type=_positive_int, default=None,
+                        help="Stream the table, counting the QI values and writing the rows with "
+                             "this number of processes.")
+    parser.add_argument("--dgh_cache", type=str, default=None,
+                        help="Directory where to keep the compiled generalization files, which "
+                             "are loaded instead of parsing them again.")
+    parser.add_argument("--algorithm", "-a", choices=ALGORITHMS, default='datafly',
+                        help="Generalization algorithm: the Datafly heuristic, the search of the "
+                             "lattice of levels of generalization for the k-anonymous ones with "
+                             "the minimal loss, or the Mondrian partitioning.")
+    parser.add_argument("--numeric", "-n", type=str, default=[], nargs='+',
+                        help="Names of the Quasi Identifiers which are numeric and have no "
+                             "generalization file (only with the Mondrian algorithm).")
+    parser.add_argument("--stats", type=str, default=None,
+                        help="Path to a JSON file where to write the duration of each phase and "
+                             "the counters of the anonymization, one record for each value of K.")
+    parser.add_argument("--verbose", "-v", action="store_true",
+                        help="Print some logging and the progress of the reading and of the "
+                             "writing of the table.")
+    parser.add_argument("--debug", action="store_true",
+                        help="Print the debug messages.")
     args = parser.parse_args()
+    if args.numeric and args.algorithm != 'mondrian':
+        parser.error("argument --numeric/-n: only valid with --algorithm mondrian")
+
+    _DEBUG = args.debug
 
     try:
 
         start = datetime.now()
 
         dgh_paths = dict()
-        for i, qi_name in enumerate(args.quasi_identifier):
+        categorical = [qi_name for qi_name in args.quasi_identifier
+                       if qi_name not in args.numeric]
+        for i, qi_name in enumerate(categorical):
             dgh_paths[qi_name] = args.domain_gen_hierarchies[i]
-        table = CsvTable(args.private_table, dgh_paths)
+        table = CsvTable(args.private_table, dgh_paths, args.mmap, args.dgh_cache)
+        stats = list()
         try:
-            table.anonymize(args.quasi_identifier, args.k, args.output, v=False)
+            if len(args.k) == 1:
+                stats.append(table.anonymize(args.quasi_identifier, args.k[0], args.output,
+                                             v=args.verbose, chunk_size=args.chunk_size,
+                                             workers=args.workers, algorithm=args.algorithm))
+            else:
+                sweep_stats = dict()
+                plans = table.sweep(args.quasi_identifier, args.k, chunk_size=args.chunk_size,
+                                    workers=args.workers, algorithm=args.algorithm,
+                                    stats=sweep_stats)
+                output_root, output_ext = os.path.splitext(args.output)
+                for k in args.k:
+                    stats.append(table.anonymize(args.quasi_identifier, k,
+                                                 "%s_k%d%s" % (output_root, k, output_ext),
+                                                 v=args.verbose, workers=args.workers,
+                                                 algorithm=args.algorithm, plan=plans[k],
+                                                 stats=sweep_stats[k]))
+            if args.stats is not None:
+                Stats.write(stats, args.stats)
         except KeyError as error:
-            if len(error.args) > 0:
-                _Table._log("[ERROR] Quasi Identifier '%s' is not valid." % error.args[0],
+            if len(error.args) > 1:
+                _Table._log("[ERROR] Value '%s' is not in hierarchy for attribute '%s'.",
+                            error.args[0], args.quasi_identifier[error.args[1]],
+                            endl=True, enabled=True)
+            elif len(error.args) > 0:
+                _Table._log("[ERROR] Quasi Identifier '%s' is not valid.", error.args[0],
                             endl=True, enabled=True)
             else:
                 _Table._log("[ERROR] A Quasi Identifier is not valid.", endl=True, enabled=True)
 
         end = (datetime.now() - start).total_seconds()
-        _Table._log("[LOG] Done in %.2f seconds (%.3f minutes (%.2f hours))" %
-                    (end, end / 60, end / 60 / 60), endl=True, enabled=True)
+        _Table._log("[LOG] Done in %.2f seconds (%.3f minutes (%.2f hours))",
+                    end, end / 60, end / 60 / 60, endl=True, enabled=True)
 
     except FileNotFoundError as error:
-        _Table._log("[ERROR] File '%s' has not been found." % error.filename,
+        _Table._log("[ERROR] File '%s' has not been found.", error.filename,
                     endl=True, enabled=True)
     except IOError as error:
-        _Table._log("[ERROR] There has been an error with reading file '%s'." % error.filename,
+        _Table._log("[ERROR] There has been an error with reading file '%s'.", error.filename,
                     endl=True, enabled=True)
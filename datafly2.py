@@ -4,9 +4,14 @@ import sys
 from datetime import datetime
 from io import StringIO
 from dgh import CsvDGH
+from engine import DisjointSet
+from progress import Progress
 
 
-_DEBUG = True
+_DEBUG = False
+"""
+If True the debug messages are printed.
+"""
 
 
 class _Table:
@@ -63,17 +68,13 @@ class _Table:
                             k-anonymization.
         :param k:           Level of anonymity.
         :param output_path: Path to the output file.
-        :param v:           If True prints some logging.
+        :param v:           If True prints some logging, and the progress of the reading and of
+                            the generalization.
         :raises KeyError:   If a QI attribute name is not valid.
         :raises IOError:    If the output file cannot be written.
         """
 
-        global _DEBUG
-
-        if v:
-            _DEBUG = False
-
-        self._debug("[DEBUG] Creating the output file...", _DEBUG)
+        self._debug("[DEBUG] Creating the output file...")
         try:
             output = open(output_path, 'w')
         except IOError:
@@ -83,13 +84,19 @@ class _Table:
         # Start reading the table file from the top:
         self.table.seek(0)
 
-        self._debug("[DEBUG] Instantiating the QI frequency dictionary...", _DEBUG)
+        self._debug("[DEBUG] Instantiating the QI frequency dictionary...")
         # Dictionary whose keys are sequences of values for the Quasi Identifiers and whose values
-        # are couples (n, s) where n is the number of occurrences of a sequence and s is a set
-        # containing the indices of the rows in the original table file with those QI values:
+        # are couples (n, c) where n is the number of occurrences of a sequence and c is the root of
+        # its set of equivalence classes:
         qi_frequency = dict()
 
-        self._debug("[DEBUG] Instantiating the attributes domains dictionary...", _DEBUG)
+        # Disjoint set of the equivalence classes, where merged classes share the same root:
+        classes = DisjointSet()
+        # Dictionary whose keys are the indices of the rows in the original table file and whose
+        # values are the (not generalized) equivalence classes of the rows:
+        row_classes = dict()
+
+        self._debug("[DEBUG] Instantiating the attributes domains dictionary...")
         # Dictionary whose keys are the indices in the QI attribute names list, and whose values are
         # sets containing the corresponding domain elements:
         domains = dict()
@@ -103,35 +110,31 @@ class _Table:
             gen_levels[i] = 0
 
         
-        for i, row in enumerate(self.table):
+        for i, row in enumerate(Progress("Reading the table", enabled=v).track(self.table)):
             # i = index row
             # row value
             qi_sequence = self._get_values(row, qi_names, i)
 
             # Skip if this row must be ignored:
             if qi_sequence is None:
-                self._debug("[DEBUG] Ignoring row %d with values '%s'..." % (i, row.strip()),
-                            _DEBUG)
+                self._debug("[DEBUG] Ignoring row %d with values '%s'...", i, row.strip())
                 continue
             else:
                 qi_sequence = tuple(qi_sequence)
 
             if qi_sequence in qi_frequency:
-                occurrences = qi_frequency[qi_sequence][0] + 1 # add occurence of qi_sequence
-                rows_set = qi_frequency[qi_sequence][1].union([i]) # add index
-                qi_frequency[qi_sequence] = (occurrences, rows_set) # update value
+                occurrences, class_idx = qi_frequency[qi_sequence]
+                qi_frequency[qi_sequence] = (occurrences + 1, class_idx)
             else:
-                # Initialize number of occurrences and set of row indices:
-                qi_frequency[qi_sequence] = (1, set())
-                qi_frequency[qi_sequence][1].add(i)
+                # Initialize number of occurrences and a new equivalence class:
+                class_idx = classes.add()
+                qi_frequency[qi_sequence] = (1, class_idx)
 
                 # Update domain set for each attribute in this sequence:
                 for j, value in enumerate(qi_sequence):
                     domains[j].add(value)
 
-            self._log("[LOG] Read line %d from the input file." % i, endl=False, enabled=v)
-
-        self._log('', endl=True, enabled=v)
+            row_classes[i] = class_idx
 
         while True:
 
@@ -144,8 +147,8 @@ class _Table:
                 if qi_frequency[qi_sequence][0] < k:
                     # Update the number of tuples which are not k-anonymous:
                     count += qi_frequency[qi_sequence][0]
-            self._debug("[DEBUG] %d tuples are not yet k-anonymous..." % count, _DEBUG)
-            self._log("[LOG] %d tuples are not yet k-anonymous..." % count, endl=True, enabled=v)
+            self._debug("[DEBUG] %d tuples are not yet k-anonymous...", count)
+            self._log("[LOG] %d tuples are not yet k-anonymous...", count, endl=True, enabled=v)
 
             # Limit the number of tuples to suppress to k:
             if count > k:
@@ -159,9 +162,9 @@ class _Table:
 
                 # Index of the attribute to generalize:
                 attribute_idx = max_attribute_idx
-                self._debug("[DEBUG] Attribute with most distinct values is '%s'..." %
-                            qi_names[attribute_idx], _DEBUG)
-                self._log("[LOG] Current attribute with most distinct values is '%s'." %
+                self._debug("[DEBUG] Attribute with most distinct values is '%s'...",
+                            qi_names[attribute_idx])
+                self._log("[LOG] Current attribute with most distinct values is '%s'.",
                           qi_names[attribute_idx], endl=True, enabled=v)
 
                 # Generalize each value for that attribute and update the attribute set in the
@@ -172,19 +175,17 @@ class _Table:
 
                 # Note: using the list of keys since the dictionary is changed in size at runtime
                 # and it can't be used an iterator:
-                for j, qi_sequence in enumerate(list(qi_frequency)):
-
-                    self._log("[LOG] Generalizing attribute '%s' for sequence %d..." %
-                              (qi_names[attribute_idx], j), endl=False, enabled=v)
+                progress = Progress("Generalizing attribute '%s'" % qi_names[attribute_idx],
+                                    len(qi_frequency), enabled=v, unit='sequences')
+                for j, qi_sequence in enumerate(progress.track(list(qi_frequency))):
 
                     # Get the generalized value:
                     if qi_sequence[attribute_idx] in generalizations:
                         # Find directly the generalized value in the look up table:
                         generalized_value = generalizations[attribute_idx]
                     else:
-                        self._debug(
-                            "[DEBUG] Generalizing value '%s'..." % qi_sequence[attribute_idx],
-                            _DEBUG)
+                        self._debug("[DEBUG] Generalizing value '%s'...",
+                                    qi_sequence[attribute_idx])
                         # Get the corresponding generalized value from the attribute DGH:
                         try:
                             generalized_value = self.dghs[qi_names[attribute_idx]]\
@@ -192,9 +193,9 @@ class _Table:
                                 qi_sequence[attribute_idx],
                                 gen_levels[attribute_idx]) 
                         except KeyError as error:
-                            self._log('', endl=True, enabled=True)
-                            self._log("[ERROR] Value '%s' is not in hierarchy for attribute '%s'."
-                                      % (error.args[0], qi_names[attribute_idx]),
+                            self._log('', endl=True, enabled=v)
+                            self._log("[ERROR] Value '%s' is not in hierarchy for attribute '%s'.",
+                                      error.args[0], qi_names[attribute_idx],
                                       endl=True, enabled=True)
                             output.close()
                             return
@@ -217,10 +218,10 @@ class _Table:
                         # Update the number of occurrences:
                         occurrences = qi_frequency[new_qi_sequence][0] \
                                       + qi_frequency[qi_sequence][0]
-                        # Unite the row indices sets:
-                        rows_set = qi_frequency[new_qi_sequence][1]\
-                            .union(qi_frequency[qi_sequence][1])
-                        qi_frequency[new_qi_sequence] = (occurrences, rows_set)
+                        # Merge the equivalence classes, without copying their rows:
+                        class_idx = classes.union(qi_frequency[new_qi_sequence][1],
+                                                  qi_frequency[qi_sequence][1])
+                        qi_frequency[new_qi_sequence] = (occurrences, class_idx)
                         # Remove the old sequence:
                         qi_frequency.pop(qi_sequence)
                     else:
@@ -228,15 +229,13 @@ class _Table:
                         qi_frequency[new_qi_sequence] = qi_frequency.pop(qi_sequence)
 
                     # Update domain set with this attribute value:
-                    domains[attribute_idx].add(qi_sequence[attribute_idx])
-
-                self._log('', endl=True, enabled=v)
+                    domains[attribute_idx].add(generalized_value)
 
                 # Update current level of generalization:
                 gen_levels[attribute_idx] += 1
 
-                self._log("[LOG] Generalized attribute '%s'. Current generalization level is %d." %
-                          (qi_names[attribute_idx], gen_levels[attribute_idx]), endl=True,
+                self._log("[LOG] Generalized attribute '%s'. Current generalization level is %d.",
+                          qi_names[attribute_idx], gen_levels[attribute_idx], endl=True,
                           enabled=v)
 
             else:
@@ -246,32 +245,36 @@ class _Table:
                 for qi_sequence, data in qi_frequency.items():
                     if data[0] < k:
                         qi_frequency.pop(qi_sequence)
-                self._log("[LOG] Suppressed %d tuples." % count, endl=True, enabled=v)
+                self._log("[LOG] Suppressed %d tuples.", count, endl=True, enabled=v)
+
+                # Dictionary whose keys are the roots of the equivalence classes which are not
+                # suppressed and whose values are the corresponding sequences:
+                class_sequences = dict((data[1], qi_sequence)
+                                       for qi_sequence, data in qi_frequency.items())
 
                 # Start to read the table file from the start:
                 self.table.seek(0)
 
-                self._debug("[DEBUG] Writing the anonymized table...", _DEBUG)
+                self._debug("[DEBUG] Writing the anonymized table...")
                 self._log("[LOG] Writing anonymized table...", endl=True, enabled=v)
                 for i, row in enumerate(self.table):
 
-                    self._debug("[DEBUG] Reading row %d from original table..." % i, _DEBUG)
+                    self._debug("[DEBUG] Reading row %d from original table...", i)
                     table_row = self._get_values(row, list(self.attributes), i)
 
                     # Skip this row if it must be ignored:
                     if table_row is None:
-                        self._debug("[DEBUG] Skipped reading row %d from original table..." % i,
-                                    _DEBUG)
+                        self._debug("[DEBUG] Skipped reading row %d from original table...", i)
                         continue
 
-                    # Find sequence corresponding to this row index:
-                    for qi_sequence in qi_frequency:
-                        if i in qi_frequency[qi_sequence][1]:
-                            line = self._set_values(table_row, qi_sequence, qi_names)
-                            self._debug("[DEBUG] Writing line %d from original table to anonymized "
-                                        "table..." % i, _DEBUG)
-                            print(line, file=output, end="")
-                            break
+                    # Find sequence corresponding to the class of this row (none if it's
+                    # suppressed):
+                    class_idx = classes.find(row_classes[i]) if i in row_classes else None
+                    if class_idx in class_sequences:
+                        line = self._set_values(table_row, class_sequences[class_idx], qi_names)
+                        self._debug("[DEBUG] Writing line %d from original table to anonymized "
+                                    "table...", i)
+                        print(line, file=output, end="")
 
                 break
 
@@ -280,33 +283,38 @@ class _Table:
         self._log("[LOG] All done.", endl=True, enabled=v)
 
     @staticmethod
-    def _log(content, enabled=True, endl=True):
+    def _log(content, *args, enabled=True, endl=True):
 
         """
-        Prints a log message.
+        Prints a log message. It's formatted only if it's printed.
 
-        :param content: Content of the message.
+        :param content: Content of the message, with a format specifier for each argument.
+        :param args:    Arguments of the message.
         :param enabled: If False the message is not printed.
+        :param endl:    If False the message replaces the current line instead of ending it.
         """
 
-        if enabled:
-            if endl:
-                print(content)
-            else:
-                sys.stdout.write('\r' + content)
+        if not enabled:
+            return
+        if args:
+            content = content % args
+        if endl:
+            print(content)
+        else:
+            sys.stdout.write('\r' + content)
 
     @staticmethod
-    def _debug(content, enabled=False):
+    def _debug(content, *args):
 
         """
-        Prints a debug message.
+        Prints a debug message if debugging is enabled. It's formatted only if it's printed.
 
-        :param content: Content of the message.
-        :param enabled: If False the message is not printed.
+        :param content: Content of the message, with a format specifier for each argument.
+        :param args:    Arguments of the message.
         """
 
-        if enabled:
-            print(content)
+        if _DEBUG:
+            print(content % args if args else content)
 
     def _init_table(self, pt_path: str):
 
@@ -458,8 +466,12 @@ if __name__ == "__main__":
                         type=int, help="Value of K.")
     parser.add_argument("--output", "-o", required=True,
                         type=str, help="Path to the output file.")
+    parser.add_argument("--debug", action="store_true",
+                        help="Print the debug messages.")
     args = parser.parse_args()
 
+    _DEBUG = args.debug
+
     try:
 
         start = datetime.now()
@@ -472,18 +484,18 @@ if __name__ == "__main__":
             table.anonymize(args.quasi_identifier, args.k, args.output, v=True)
         except KeyError as error:
             if len(error.args) > 0:
-                _Table._log("[ERROR] Quasi Identifier '%s' is not valid." % error.args[0],
+                _Table._log("[ERROR] Quasi Identifier '%s' is not valid.", error.args[0],
                             endl=True, enabled=True)
             else:
                 _Table._log("[ERROR] A Quasi Identifier is not valid.", endl=True, enabled=True)
 
         end = (datetime.now() - start).total_seconds()
-        _Table._log("[LOG] Done in %.2f seconds (%.3f minutes (%.2f hours))" %
-                    (end, end / 60, end / 60 / 60), endl=True, enabled=True)
+        _Table._log("[LOG] Done in %.2f seconds (%.3f minutes (%.2f hours))",
+                    end, end / 60, end / 60 / 60, endl=True, enabled=True)
 
     except FileNotFoundError as error:
-        _Table._log("[ERROR] File '%s' has not been found." % error.filename,
+        _Table._log("[ERROR] File '%s' has not been found.", error.filename,
                     endl=True, enabled=True)
     except IOError as error:
-        _Table._log("[ERROR] There has been an error with reading file '%s'." % error.filename,
+        _Table._log("[ERROR] There has been an error with reading file '%s'.", error.filename,
                     endl=True, enabled=True)
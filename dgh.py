@@ -1,6 +1,55 @@
 import csv
+import hashlib
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import warnings
+from array import array
 from io import StringIO
-from tree import Node, Tree
+from tree import ArrayTree
+
+
+_CACHE_MAGIC = b'DGHC'
+"""
+Bytes at the start of every compiled DGH file.
+"""
+
+_CACHE_VERSION = 1
+"""
+Version of the compiled DGH file format. Compiled files with another version are rebuilt.
+"""
+
+_CACHE_HEADER = struct.Struct('<4sI32sI')
+"""
+Header of a compiled DGH file: magic bytes, format version, SHA-256 digest of the source file and
+number of levels of generalization.
+"""
+
+_CACHE_SECTION = struct.Struct('<III')
+"""
+Header of a section of a compiled DGH file: number of strings, length in bytes of the string
+table and number of codes which follow it.
+"""
+
+
+def _digest(path: str) -> bytes:
+
+    """
+    Computes the SHA-256 digest of a file.
+
+    :param path:                Path to the file.
+    :return:                    The digest of the file content.
+    :raises FileNotFoundError:  If the file is not found.
+    :raises IOError:            If the file cannot be read.
+    """
+
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(1 << 16), b''):
+            digest.update(block)
+    return digest.digest()
 
 
 class _DGH:
@@ -17,16 +66,41 @@ class _DGH:
 
         self.hierarchies = dict()
         """
-        Dictionary where the values are trees and the keys are the values of the corresponding 
-        roots.
+        Dictionary where the values are array-backed trees and the keys are the values of the
+        corresponding roots. It's built by _build_hierarchies on first use.
         """
 
         self.gen_levels = dict()
         """
-        Dictionary whose keys are the hierarchies root values and whose values are the hierarchies 
+        Dictionary whose keys are the hierarchies root values and whose values are the hierarchies
         depths (number of generalization levels).
         """
 
+        self.labels = list()
+        """
+        List whose elements are, for each level of generalization, the list of the values on that
+        level indexed by their integer code.
+        """
+
+        self.codes = list()
+        """
+        List whose elements are, for each level of generalization, a dictionary whose keys are the
+        values on that level and whose values are the corresponding integer codes.
+        """
+
+        self.parent_codes = list()
+        """
+        List whose elements are, for each level of generalization but the last, an array whose
+        items are the codes on the level above of the generalizations of each code. A root which is
+        below the last level is generalized to itself.
+        """
+
+        self._cache = None
+        """
+        Memory map of the compiled file this DGH is loaded from, None if it's parsed from its
+        source file. The parent code arrays are views on it, so it's closed along with them.
+        """
+
     def generalize(self, value, gen_level=None):
 
         """
@@ -38,6 +112,20 @@ class _DGH:
         :raises KeyError:   If the value is not part of the domain.
         """
 
+        if gen_level is not None:
+            # Look up the code of this value and the one of its parent:
+            try:
+                code = self.codes[gen_level][value]
+            except (IndexError, KeyError):
+                raise KeyError(value)
+            if self.gen_levels.get(value, gen_level + 1) <= gen_level:
+                # The value is a hierarchy root:
+                return None
+            return self.labels[gen_level + 1][self.parent_codes[gen_level][code]]
+
+        if not self.hierarchies:
+            self._build_hierarchies()
+
         # Search across all hierarchies (slow if there are a lot of hierarchies):
         for hierarchy in self.hierarchies:
 
@@ -60,13 +148,234 @@ class _DGH:
         # The value is not found:
         raise KeyError(value)
 
+    def generalize_to(self, value, gen_level, target_level):
+
+        """
+        Returns the generalization of a value on an arbitrary level above its own one.
+
+        :param value:           Value to generalize.
+        :param gen_level:       Current level of generalization, where 0 means it's not generalized.
+        :param target_level:    Level of generalization to reach. If it's above the hierarchy root,
+                                the root is returned.
+        :return:                The generalized value on the target level.
+        :raises KeyError:       If the value is not part of the domain.
+        :raises ValueError:     If the target level is below the current one.
+        """
+
+        if target_level < gen_level:
+            raise ValueError(target_level)
+
+        try:
+            code = self.codes[gen_level][value]
+        except (IndexError, KeyError):
+            raise KeyError(value)
+
+        # Note: a root is generalized to itself, so it's enough to stop on the last level:
+        target_level = min(target_level, len(self.parent_codes))
+        for level in range(gen_level, target_level):
+            code = self.parent_codes[level][code]
+
+        return self.labels[target_level][code] if target_level > gen_level else value
+
+    def generalize_all(self, values, gen_level, target_level):
+
+        """
+        Returns the generalizations of many values on an arbitrary level above their own one.
+        Each distinct value is looked up only once.
+
+        :param values:          Iterable of values to generalize, all on the same level.
+        :param gen_level:       Current level of generalization, where 0 means it's not generalized.
+        :param target_level:    Level of generalization to reach.
+        :return:                List of the generalized values, in the same order.
+        :raises KeyError:       If a value is not part of the domain.
+        :raises ValueError:     If the target level is below the current one.
+        """
+
+        # Look up table for the values already generalized:
+        generalizations = dict()
+        generalized_values = list()
+
+        for value in values:
+            if value not in generalizations:
+                generalizations[value] = self.generalize_to(value, gen_level, target_level)
+            generalized_values.append(generalizations[value])
+
+        return generalized_values
+
+    def _encode(self, parents: dict):
+
+        """
+        Assigns an integer code to every value on every level of generalization and builds the
+        parent code arrays.
+
+        :param parents: Dictionary whose keys are couples (value, gen_level) and whose values are
+                        the generalizations of that value on the level above, None for the roots.
+        """
+
+        depth = max(self.gen_levels.values(), default=0)
+
+        self.labels = [list() for _ in range(depth + 1)]
+        self.codes = [dict() for _ in range(depth + 1)]
+        self.parent_codes = list()
+
+        for value, gen_level in parents:
+            if gen_level == 0:
+                self.codes[0][value] = len(self.labels[0])
+                self.labels[0].append(value)
+
+        for gen_level in range(depth):
+            parent_codes = array('l')
+            codes, labels = self.codes[gen_level + 1], self.labels[gen_level + 1]
+            for value in self.labels[gen_level]:
+                # A root stays the same on the levels above:
+                parent = parents.get((value, gen_level)) or value
+                if parent not in codes:
+                    codes[parent] = len(labels)
+                    labels.append(parent)
+                parent_codes.append(codes[parent])
+            self.parent_codes.append(parent_codes)
+
+    def _build_hierarchies(self):
+
+        """
+        Builds the hierarchy trees, which are only needed to search a value on an unknown level.
+        """
+
+        pass
+
+    def _load(self, cache_path: str, digest: bytes) -> bool:
+
+        """
+        Loads the code arrays from a compiled file. The parent code arrays are views on the memory
+        map of the file, and only the string tables are decoded.
+
+        :param cache_path:  Path to the compiled file.
+        :param digest:      SHA-256 digest of the source file.
+        :return:            True if the DGH has been loaded, False if the compiled file is missing,
+                            stale, of another version or corrupt.
+        """
+
+        try:
+            with open(cache_path, 'rb') as file:
+                cache = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return False
+
+        try:
+            magic, version, cache_digest, depth = _CACHE_HEADER.unpack_from(cache)
+            if magic != _CACHE_MAGIC or version != _CACHE_VERSION or cache_digest != digest:
+                cache.close()
+                return False
+        except struct.error:
+            cache.close()
+            return False
+
+        view = memoryview(cache)
+        offset = _CACHE_HEADER.size
+        sections = list()
+        try:
+            # One section for each level of generalization, then one for the roots:
+            for _ in range(depth + 2):
+                n_strings, size, n_codes = _CACHE_SECTION.unpack_from(cache, offset)
+                offset += _CACHE_SECTION.size
+                strings = str(cache[offset:offset + size], 'utf-8').split('\0') \
+                    if n_strings else []
+                # Note: the codes are aligned on 4 bytes:
+                offset += size + -size % 4
+                if len(strings) != n_strings or offset + 4 * n_codes > len(cache):
+                    raise ValueError(cache_path)
+                codes = view[offset:offset + 4 * n_codes].cast('i')
+                if sys.byteorder != 'little':
+                    codes = array('i', codes)
+                    codes.byteswap()
+                offset += 4 * n_codes
+                sections.append((strings, codes))
+            # Every value but the ones on the last level has a parent code, and every root a depth:
+            if any(len(strings) != len(codes) for strings, codes in sections[:-2]) or \
+                    len(sections[-1][0]) != len(sections[-1][1]):
+                raise ValueError(cache_path)
+        except (struct.error, UnicodeDecodeError, ValueError):
+            # The file is truncated or corrupt: the views must be released before closing it:
+            for _, codes in sections:
+                if isinstance(codes, memoryview):
+                    codes.release()
+            view.release()
+            cache.close()
+            return False
+
+        self.labels = [strings for strings, _ in sections[:-1]]
+        self.codes = [dict(zip(labels, range(len(labels)))) for labels in self.labels]
+        self.parent_codes = [codes for _, codes in sections[:-2]]
+        roots, depths = sections[-1]
+        self.gen_levels = dict(zip(roots, depths))
+        self._cache = cache
+
+        return True
+
+    def _save(self, cache_path: str, digest: bytes):
+
+        """
+        Writes the code arrays to a compiled file. The file is replaced at once, so that
+        concurrent readers never see it half written.
+
+        :param cache_path:  Path to the compiled file.
+        :param digest:      SHA-256 digest of the source file.
+        :raises OSError:    If the file cannot be written.
+        """
+
+        sections = [(labels, parent_codes)
+                    for labels, parent_codes in zip(self.labels, self.parent_codes + [[]])]
+        sections.append((list(self.gen_levels), list(self.gen_levels.values())))
+
+        directory = os.path.dirname(cache_path) or '.'
+        os.makedirs(directory, exist_ok=True)
+        descriptor, temp_path = tempfile.mkstemp(dir=directory)
+        try:
+            with os.fdopen(descriptor, 'wb') as file:
+                file.write(_CACHE_HEADER.pack(
+                    _CACHE_MAGIC, _CACHE_VERSION, digest, len(self.labels) - 1))
+                for strings, codes in sections:
+                    blob = '\0'.join(strings).encode('utf-8')
+                    file.write(_CACHE_SECTION.pack(len(strings), len(blob), len(codes)))
+                    file.write(blob + b'\0' * (-len(blob) % 4))
+                    codes = array('i', codes)
+                    if sys.byteorder != 'little':
+                        codes.byteswap()
+                    file.write(codes.tobytes())
+            # Note: the temporary file is only readable by its owner:
+            os.chmod(temp_path, 0o644)
+            os.replace(temp_path, cache_path)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+
 
 class CsvDGH(_DGH):
 
-    def __init__(self, dgh_path):
+    def __init__(self, dgh_path, cache_dir=None):
+
+        """
+        :param cache_dir:   Directory of the compiled DGH files, named after the digest of their
+                            source file. If None the source file is always parsed.
+        """
 
         super().__init__(dgh_path)
 
+        self._dgh_path = dgh_path
+        """
+        Path to the DGH file, read again to build the hierarchy trees on first use.
+        """
+
+        if cache_dir is not None:
+            digest = _digest(dgh_path)
+            cache_path = os.path.join(cache_dir, digest.hex() + '.dgh')
+            if self._load(cache_path, digest):
+                return
+
+        # Dictionary whose keys are couples (value, gen_level) and whose values are the
+        # generalizations of that value on the level above:
+        parents = dict()
+
         try:
             with open(dgh_path, 'r') as file:
                 for line in file:
@@ -77,19 +386,62 @@ class CsvDGH(_DGH):
                         raise
                     values = next(csv_reader)
 
-                    # If it doesn't exist a hierarchy with this root, add one:
-                    if values[-1] not in self.hierarchies:
-                        self.hierarchies[values[-1]] = Tree(Node(values[-1]))
-                        # Add the number of generalization levels:
+                    # If it doesn't exist a hierarchy with this root, add its number of
+                    # generalization levels (the trees are only built if they are searched):
+                    if values[-1] not in self.gen_levels:
                         self.gen_levels[values[-1]] = len(values) - 1
-                    # Populate hierarchy with the other values:
-                    self._insert_hierarchy(values[:-1], self.hierarchies[values[-1]])
+                    # Index the generalizations of each value on this line:
+                    self._index_hierarchy(values, parents)
 
         except FileNotFoundError:
             raise
         except IOError:
             raise
 
+        self._encode(parents)
+
+        if cache_dir is not None:
+            # The compiled file only speeds up the next loads, so the DGH is usable anyway:
+            try:
+                self._save(cache_path, digest)
+            except OSError as error:
+                warnings.warn("The compiled file '%s' cannot be written: %s." %
+                              (cache_path, error.strerror or error), RuntimeWarning)
+
+    def _build_hierarchies(self):
+
+        """
+        Builds the hierarchy trees reading the DGH file again, so that they contain every path of
+        the file (the code arrays only keep the first generalization of each value).
+
+        :raises FileNotFoundError:  If the file is not found.
+        :raises IOError:            If the file cannot be read.
+        """
+
+        with open(self._dgh_path, 'r', newline='') as file:
+            for values in filter(None, csv.reader(file)):
+                # If it doesn't exist a hierarchy with this root, add one:
+                if values[-1] not in self.hierarchies:
+                    self.hierarchies[values[-1]] = ArrayTree(values[-1])
+                # Populate hierarchy with the other values:
+                self._insert_hierarchy(values[:-1], self.hierarchies[values[-1]])
+
+    @staticmethod
+    def _index_hierarchy(values, parents):
+
+        """
+        Adds values, ordered from child to parent, to the generalizations index. If a value already
+        has an entry on the same level, the first one is kept (as the search on the trees would do).
+
+        :param values:  List of values to index.
+        :param parents: Index where to add the values.
+        """
+
+        for gen_level, value in enumerate(values):
+            if (value, gen_level) not in parents:
+                parents[(value, gen_level)] = values[gen_level + 1] \
+                    if gen_level + 1 < len(values) else None
+
     @staticmethod
     def _insert_hierarchy(values, tree):
 
@@ -101,18 +453,4 @@ class CsvDGH(_DGH):
         :return:        True if the hierarchy has been inserted, False otherwise.
         """
 
-        current_node = tree.root
-
-        for i, value in enumerate(reversed(values)):
-
-            if value in current_node.children:
-                current_node = current_node.children[value]
-                continue
-            else:
-                # Insert the hierarchy from this node:
-                for v in list(reversed(values))[i:]:
-                    current_node.add_child(Node(v))
-                    current_node = current_node.children[v]
-                return True
-
-        return False
+        return tree.add_path(reversed(values))
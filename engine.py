@@ -0,0 +1,1584 @@
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import accumulate, compress, islice, product, repeat
+from operator import add, getitem, le, mul, ne, sub
+from stats import Stats
+
+
+def _encode(codes: list, values) -> tuple:
+
+    """
+    Encodes a sequence of (not generalized) Quasi Identifier values.
+
+    :param codes:       List of the dictionaries of the codes of the not generalized values, one
+                        for each Quasi Identifier attribute.
+    :param values:      List of values, one for each Quasi Identifier attribute.
+    :return:            Tuple of the codes of the values.
+    :raises KeyError:   If a value is not part of the corresponding domain; its arguments are the
+                        value and the index of the attribute.
+    """
+
+    try:
+        return tuple(map(getitem, codes, values))
+    except KeyError:
+        # Find the attribute of the value which is not valid:
+        for i, value in enumerate(values):
+            if value not in codes[i]:
+                raise KeyError(value, i)
+        raise
+
+
+def _most_distinct_attribute(engine):
+
+    """
+    Gets the attribute whose domain has the max cardinality, among the ones which can still be
+    generalized.
+
+    :param engine:  Engine or roll up engine whose attributes to compare.
+    :return:        Index of the attribute, None if every attribute is on its hierarchy roots.
+    """
+
+    max_cardinality, max_attribute_idx = 0, None
+    for attribute_idx in range(len(engine.dghs)):
+        if not engine.can_generalize(attribute_idx):
+            continue
+        cardinality = engine.domain_size(attribute_idx)
+        if cardinality > max_cardinality:
+            max_cardinality = cardinality
+            max_attribute_idx = attribute_idx
+
+    return max_attribute_idx
+
+
+def _datafly(engine, stats: Stats):
+
+    """
+    Generalizes with the Datafly heuristic until at most k rows are not k-anonymous: each time, the
+    attribute with the most distinct values is generalized to the level above. The engine counts
+    the rows and the distinct values on the current levels of generalization, either from the
+    equivalence classes of the rows or from the histograms of the sequences.
+
+    :param engine:  Engine or roll up engine to generalize.
+    :param stats:   Metrics where to record each iteration.
+    """
+
+    while engine.non_anonymous > engine.k:
+        attribute_idx = _most_distinct_attribute(engine)
+        # Stop if every attribute is already on its hierarchy roots:
+        if attribute_idx is None:
+            break
+        start, classes = time.perf_counter(), engine.count_classes()
+        values = engine.generalize(attribute_idx)
+        stats.add_iteration(engine.gen_levels, engine.count_classes(),
+                            classes - engine.count_classes(), time.perf_counter() - start, values)
+
+
+class DisjointSet:
+
+    def __init__(self):
+
+        """
+        Represents a collection of disjoint sets of integer elements (union-find), with union by
+        rank and path halving.
+        """
+
+        self.parents = array('l')
+        """
+        Array containing the parent of every element; a root is its own parent.
+        """
+
+        self.ranks = array('b')
+        """
+        Array containing the rank (upper bound of the height) of every element.
+        """
+
+    def __len__(self):
+
+        """
+        :return:    Number of elements.
+        """
+
+        return len(self.parents)
+
+    def add(self) -> int:
+
+        """
+        Adds an element in a new singleton set.
+
+        :return:    The new element.
+        """
+
+        element = len(self.parents)
+        self.parents.append(element)
+        self.ranks.append(0)
+
+        return element
+
+    def find(self, element: int) -> int:
+
+        """
+        Finds the representative of the set containing an element.
+
+        :param element: Element to find.
+        :return:        The root of the element set.
+        """
+
+        parents = self.parents
+        while parents[element] != element:
+            # Make the element point to its grandparent:
+            parents[element] = parents[parents[element]]
+            element = parents[element]
+
+        return element
+
+    def union(self, a: int, b: int) -> int:
+
+        """
+        Merges the sets containing two elements.
+
+        :param a:   Element of the first set.
+        :param b:   Element of the second set.
+        :return:    The root of the merged set.
+        """
+
+        a, b = self.find(a), self.find(b)
+        if a == b:
+            return a
+
+        # Attach the shorter tree under the taller one:
+        if self.ranks[a] < self.ranks[b]:
+            a, b = b, a
+        self.parents[b] = a
+        if self.ranks[a] == self.ranks[b]:
+            self.ranks[a] += 1
+
+        return a
+
+
+class Plan:
+
+    def __init__(self, dghs: list, gen_levels: list, kept: set, suppressed: set, loss=None):
+
+        """
+        Represents the generalization of a table: the level of generalization of each Quasi
+        Identifier attribute and the generalized sequences which are k-anonymous. It can be
+        applied to any row without the equivalence classes it has been computed from. A sequence
+        which is not among the k-anonymous ones is suppressed, even if it has not been counted
+        (e.g. when the plan is applied to another table).
+
+        :param dghs:        List of DGH instances, one for each Quasi Identifier attribute, or
+                            None if the look up tables are already filled.
+        :param gen_levels:  List of the levels of generalization, one for each attribute.
+        :param kept:        Set of the generalized sequences (tuples of values) to write.
+        :param suppressed:  Set of the generalized sequences which have been counted less than k
+                            times.
+        :param loss:        Information loss of the generalization, if it has been measured.
+        """
+
+        self.dghs = dghs
+        """
+        List of the DGH instances of the Quasi Identifier attributes.
+        """
+
+        self.gen_levels = gen_levels
+        """
+        List whose elements are, for each Quasi Identifier attribute, the level of generalization,
+        from 0 (not generalized).
+        """
+
+        self.kept = kept
+        """
+        Set of the generalized sequences which occur at least k times.
+        """
+
+        self.suppressed = suppressed
+        """
+        Set of the generalized sequences which occur less than k times.
+        """
+
+        self.loss = loss
+        """
+        Information loss of the generalization, None if it has not been measured.
+        """
+
+        self.lookups = 0
+        """
+        Number of values generalized through the DGHs to fill the look up tables (of this plan or
+        of its detached copies).
+        """
+
+        self._generalizations = [dict() for _ in gen_levels]
+        """
+        List whose elements are, for each Quasi Identifier attribute, a look up table whose keys
+        are not generalized values and whose values are the corresponding generalized ones.
+        """
+
+    def generalize(self, values):
+
+        """
+        Generalizes a sequence of (not generalized) Quasi Identifier values.
+
+        :param values:      List of values, one for each Quasi Identifier attribute.
+        :return:            Tuple of the generalized values, None if the sequence is suppressed.
+        :raises KeyError:   If a value is not part of the corresponding domain.
+        """
+
+        try:
+            sequence = tuple(map(getitem, self._generalizations, values))
+        except KeyError:
+            if self.dghs is None:
+                raise
+            # Add the missing values to the look up tables:
+            for i, value in enumerate(values):
+                if value not in self._generalizations[i]:
+                    self._generalizations[i][value] = \
+                        self.dghs[i].generalize_to(value, 0, self.gen_levels[i])
+                    self.lookups += 1
+            sequence = tuple(map(getitem, self._generalizations, values))
+
+        # Note: the sequences which have not been counted are suppressed too:
+        if sequence not in self.kept:
+            return None
+        return sequence
+
+    def detach(self):
+
+        """
+        Fills the look up tables with every not generalized value of the domains, and returns a
+        copy of this plan which does not reference the DGHs (e.g. to send it to other processes).
+
+        :return:    The detached plan.
+        """
+
+        plan = Plan(None, self.gen_levels, self.kept, self.suppressed, self.loss)
+
+        for i, dgh in enumerate(self.dghs):
+            plan._generalizations[i] = dict(
+                zip(dgh.labels[0], dgh.generalize_all(dgh.labels[0], 0, self.gen_levels[i])))
+            self.lookups += len(plan._generalizations[i])
+
+        return plan
+
+
+class Engine:
+
+    def __init__(self, dghs: list, k: int):
+
+        """
+        Represents the Quasi Identifiers of a table as integer-encoded equivalence classes, where
+        each value is replaced by its code on the current level of generalization of the attribute
+        DGH, and keeps the index of the class of every row. Classes which end up with the same
+        values are merged in a disjoint set, so the row indices are never copied.
+
+        :param dghs:    List of DGH instances, one for each Quasi Identifier attribute.
+        :param k:       Level of anonymity.
+        """
+
+        self.dghs = dghs
+        """
+        List of the DGH instances of the Quasi Identifier attributes.
+        """
+
+        self.k = k
+        """
+        Level of anonymity.
+        """
+
+        self.non_anonymous = 0
+        """
+        Number of rows whose equivalence class has less than k rows, kept up to date as rows are
+        added and classes are merged.
+        """
+
+        self.columns = [array('l') for _ in dghs]
+        """
+        List whose elements are, for each Quasi Identifier attribute, an array containing the
+        codes of the values of every equivalence class.
+        """
+
+        self.counts = array('l')
+        """
+        Array containing the number of rows of every equivalence class (only meaningful for the
+        classes which are roots of their set).
+        """
+
+        self.row_classes = array('l')
+        """
+        Array containing the index of the (not generalized) equivalence class of every row. The
+        current class of a row is the root of its set.
+        """
+
+        self.classes = DisjointSet()
+        """
+        Disjoint set of the equivalence classes, where merged classes share the same root.
+        """
+
+        self.roots = array('l')
+        """
+        Array containing the indices of the current equivalence classes, i.e. the roots.
+        """
+
+        self.domains = [dict() for _ in dghs]
+        """
+        List whose elements are, for each Quasi Identifier attribute, a dictionary whose keys are
+        the codes of the current values of the attribute and whose values are the number of
+        equivalence classes with that value.
+        """
+
+        self.gen_levels = [0 for _ in dghs]
+        """
+        List whose elements are, for each Quasi Identifier attribute, the current level of
+        generalization, from 0 (not generalized).
+        """
+
+        self._classes = dict()
+        """
+        Dictionary whose keys are tuples of (not generalized) codes and whose values are the
+        corresponding equivalence class indices, used while adding rows.
+        """
+
+        self._codes = [dgh.codes[0] for dgh in dghs]
+        """
+        List whose elements are, for each Quasi Identifier attribute, the dictionary of the codes
+        of the not generalized values.
+        """
+
+    def __len__(self):
+
+        """
+        :return:    Number of encoded rows.
+        """
+
+        return len(self.row_classes)
+
+    def add_row(self, values):
+
+        """
+        Encodes and appends the (not generalized) Quasi Identifier values of a row, adding it to
+        the equivalence class with the same values. Rows must be added before generalizing.
+
+        :param values:      List of values, one for each Quasi Identifier attribute.
+        :raises KeyError:   If a value is not part of the corresponding domain; its arguments are
+                            the value and the index of the attribute.
+        """
+
+        self.row_classes.append(self.add_sequence(values))
+
+    def add_sequence(self, values, count=1) -> int:
+
+        """
+        Encodes and adds occurrences of a sequence of (not generalized) Quasi Identifier values,
+        without recording their rows. Sequences must be added before generalizing.
+
+        :param values:      List of values, one for each Quasi Identifier attribute.
+        :param count:       Number of occurrences to add.
+        :return:            Index of the equivalence class of the sequence.
+        :raises KeyError:   If a value is not part of the corresponding domain; its arguments are
+                            the value and the index of the attribute.
+        """
+
+        codes = _encode(self._codes, values)
+
+        if codes in self._classes:
+            class_idx = self._classes[codes]
+            self._update_count(class_idx, self.counts[class_idx] + count)
+        else:
+            # Add a new equivalence class:
+            class_idx = self.classes.add()
+            self._classes[codes] = class_idx
+            self.roots.append(class_idx)
+            self.counts.append(0)
+            self._update_count(class_idx, count)
+            for i, code in enumerate(codes):
+                self.columns[i].append(code)
+                self.domains[i][code] = self.domains[i].get(code, 0) + 1
+
+        return class_idx
+
+    def can_generalize(self, attribute_idx: int) -> bool:
+
+        """
+        Checks whether an attribute can be generalized further.
+
+        :param attribute_idx:   Index of the Quasi Identifier attribute.
+        :return:                True if the attribute is not on the last level of its DGH.
+        """
+
+        return self.gen_levels[attribute_idx] < len(self.dghs[attribute_idx].parent_codes)
+
+    def generalize(self, attribute_idx: int) -> int:
+
+        """
+        Generalizes every value of an attribute to the level above, gathering the new codes
+        through the parent code array of the current level, and merges the equivalence classes
+        which end up with the same values.
+
+        :param attribute_idx:   Index of the Quasi Identifier attribute to generalize.
+        :return:                Number of values generalized (the codes of every class, merged or
+                                not).
+        :raises IndexError:     If the attribute is already on the last level of its DGH.
+        """
+
+        parent_codes = self.dghs[attribute_idx].parent_codes[self.gen_levels[attribute_idx]]
+        # Note: the codes of merged classes are gathered too, so they stay equal to their roots:
+        self.columns[attribute_idx] = array(
+            'l', map(parent_codes.__getitem__, self.columns[attribute_idx]))
+        self.gen_levels[attribute_idx] += 1
+        self._classes = dict()
+
+        # Roll up the domain of the attribute to the level above:
+        domain = dict()
+        for code, references in self.domains[attribute_idx].items():
+            parent = parent_codes[code]
+            domain[parent] = domain.get(parent, 0) + references
+        self.domains[attribute_idx] = domain
+
+        # Dictionary whose keys are the packed keys of the current classes and whose values are
+        # the positions of the merged classes in the new roots array:
+        merged = dict()
+        roots = array('l')
+
+        for root, key in zip(self.roots, self._keys()):
+            if key in merged:
+                other = roots[merged[key]]
+                new_root = self.classes.union(other, root)
+                count = self.counts[other] + self.counts[root]
+                # Both classes are replaced by the merged one:
+                self._update_count(other, 0)
+                self._update_count(root, 0)
+                self._update_count(new_root, count)
+                # One class less for each value of the merged classes:
+                self._release_values(root)
+                roots[merged[key]] = new_root
+            else:
+                merged[key] = len(roots)
+                roots.append(root)
+
+        self.roots = roots
+
+        return len(self.columns[attribute_idx])
+
+    def plan(self, stats=None) -> Plan:
+
+        """
+        Generalizes with the Datafly heuristic until at most k rows are not k-anonymous: each
+        time, the attribute with the most distinct values is generalized to the level above.
+
+        :param stats:   Metrics where to record the generalization and the suppression, if given.
+        :return:        The plan with the reached levels of generalization and the sequences to
+                        suppress.
+        """
+
+        if stats is None:
+            stats = Stats(self.k)
+        stats.classes_before = len(self.roots)
+
+        with stats.phase('generalization'):
+            _datafly(self, stats)
+
+        with stats.phase('suppression'):
+            kept, suppressed = set(), set()
+            for root in self.roots:
+                (kept if self.counts[root] >= self.k else suppressed).add(self.decode(root))
+        stats.classes_after = len(kept)
+
+        return Plan(self.dghs, list(self.gen_levels), kept, suppressed)
+
+    def count_classes(self) -> int:
+
+        """
+        :return:    Number of current equivalence classes.
+        """
+
+        return len(self.roots)
+
+    def frequencies(self):
+
+        """
+        :return:    Iterator over the number of rows of every current equivalence class.
+        """
+
+        return map(self.counts.__getitem__, self.roots)
+
+    def row_class(self, row_idx: int) -> int:
+
+        """
+        Finds the current equivalence class of a row.
+
+        :param row_idx: Index of the row in the encoded rows.
+        :return:        Index of the equivalence class.
+        """
+
+        return self.classes.find(self.row_classes[row_idx])
+
+    def resolve(self) -> array:
+
+        """
+        Finds the current equivalence class of every row.
+
+        :return:    Array containing the index of the equivalence class of every row.
+        """
+
+        return array('l', map(self.classes.find, self.row_classes))
+
+    def domain_size(self, attribute_idx: int) -> int:
+
+        """
+        Counts the distinct values an attribute currently has.
+
+        :param attribute_idx:   Index of the Quasi Identifier attribute.
+        :return:                Cardinality of the attribute domain.
+        """
+
+        return len(self.domains[attribute_idx])
+
+    def decode(self, class_idx: int) -> tuple:
+
+        """
+        Decodes the Quasi Identifier values of an equivalence class.
+
+        :param class_idx:   Index of the equivalence class.
+        :return:            Tuple of the current (generalized) values of the class.
+        """
+
+        return tuple(dgh.labels[self.gen_levels[i]][self.columns[i][class_idx]]
+                     for i, dgh in enumerate(self.dghs))
+
+    def _update_count(self, class_idx: int, count: int):
+
+        """
+        Sets the number of rows of an equivalence class, updating the number of rows which are not
+        k-anonymous.
+
+        :param class_idx:   Index of the equivalence class.
+        :param count:       New number of rows of the class.
+        """
+
+        if self.counts[class_idx] < self.k:
+            self.non_anonymous -= self.counts[class_idx]
+        if count < self.k:
+            self.non_anonymous += count
+        self.counts[class_idx] = count
+
+    def _release_values(self, class_idx: int):
+
+        """
+        Removes the references of an equivalence class to its values from the domains.
+
+        :param class_idx:   Index of the equivalence class.
+        """
+
+        for i, domain in enumerate(self.domains):
+            code = self.columns[i][class_idx]
+            if domain[code] == 1:
+                del domain[code]
+            else:
+                domain[code] -= 1
+
+    def _keys(self) -> list:
+
+        """
+        Packs the codes of each current equivalence class into a single integer, so that two
+        classes have the same key if and only if they have the same (generalized) Quasi Identifier
+        values.
+
+        :return:    List containing the key of every class.
+        """
+
+        keys = list(repeat(0, len(self.roots)))
+        for i, column in enumerate(self.columns):
+            radix = len(self.dghs[i].labels[self.gen_levels[i]])
+            codes = map(column.__getitem__, self.roots)
+            keys = list(map(add, map(mul, keys, repeat(radix)), codes))
+
+        return keys
+
+
+class Histograms:
+
+    def __init__(self, dghs: list):
+
+        """
+        Keeps the histograms of the sequences of Quasi Identifier values on any vector of levels of
+        generalization. Generalizing is a deterministic roll up of a histogram, so each one is
+        computed once, from the smallest cached histogram of a specialization, and kept for the
+        next searches (e.g. with another k) instead of counting the rows again. There is at most
+        one histogram for each node of the lattice of levels of generalization.
+
+        :param dghs:    List of DGH instances, one for each Quasi Identifier attribute.
+        """
+
+        self.dghs = dghs
+        """
+        List of the DGH instances of the Quasi Identifier attributes.
+        """
+
+        self.bottom = tuple(repeat(0, len(dghs)))
+        """
+        Levels of generalization of the not generalized histogram.
+        """
+
+        self.columns = [array('l') for _ in dghs]
+        """
+        List whose elements are, for each Quasi Identifier attribute, an array containing the codes
+        of the (not generalized) values of every sequence.
+        """
+
+        self.counts = array('l')
+        """
+        Array containing the number of occurrences of every sequence.
+        """
+
+        self.histograms = {self.bottom: (self.columns, self.counts)}
+        """
+        Dictionary whose keys are tuples of levels of generalization and whose values are the
+        corresponding histograms, as couples (code columns, counts).
+        """
+
+        self.rollups = 0
+        """
+        Number of histograms rolled up, i.e. of cache misses.
+        """
+
+        self.lookups = 0
+        """
+        Number of values generalized through the DGHs, to compose the maps of the roll ups.
+        """
+
+        self._sequences = dict()
+        """
+        Dictionary whose keys are tuples of (not generalized) codes and whose values are the
+        corresponding sequence indices, used while adding sequences.
+        """
+
+        self._codes = [dgh.codes[0] for dgh in dghs]
+        """
+        List whose elements are, for each Quasi Identifier attribute, the dictionary of the codes
+        of the not generalized values.
+        """
+
+        self._maps = dict()
+        """
+        Dictionary whose keys are triples (attribute index, level, target level) and whose values
+        are arrays containing the code on the target level of every code on the level.
+        """
+
+        self._totals = dict()
+        """
+        Dictionary whose keys are tuples of levels of generalization and whose values are couples
+        (sorted counts, cumulative sums of the sorted counts) of the corresponding histograms.
+        """
+
+        self._cardinalities = dict()
+        """
+        Dictionary whose keys are tuples of levels of generalization and whose values are the
+        numbers of distinct values of every attribute in the corresponding histograms.
+        """
+
+    def add_sequence(self, values, count=1) -> int:
+
+        """
+        Encodes and adds occurrences of a sequence of (not generalized) Quasi Identifier values.
+        Sequences must be added before getting any generalized histogram or statistic.
+
+        :param values:      List of values, one for each Quasi Identifier attribute.
+        :param count:       Number of occurrences to add.
+        :return:            Index of the sequence.
+        :raises KeyError:   If a value is not part of the corresponding domain; its arguments are
+                            the value and the index of the attribute.
+        """
+
+        codes = _encode(self._codes, values)
+
+        if codes in self._sequences:
+            sequence_idx = self._sequences[codes]
+            self.counts[sequence_idx] += count
+        else:
+            sequence_idx = len(self.counts)
+            self._sequences[codes] = sequence_idx
+            self.counts.append(count)
+            for i, code in enumerate(codes):
+                self.columns[i].append(code)
+
+        return sequence_idx
+
+    def histogram(self, gen_levels: tuple) -> tuple:
+
+        """
+        Gets the histogram on some levels of generalization, from the cache or rolling up the
+        smallest cached one of its specializations.
+
+        :param gen_levels:  Tuple of levels of generalization, one for each attribute.
+        :return:            Couple (code columns, counts) of the histogram.
+        """
+
+        if gen_levels not in self.histograms:
+            source = min((other for other in self.histograms if all(map(le, other, gen_levels))),
+                         key=lambda other: len(self.histograms[other][1]))
+            self.histograms[gen_levels] = self._rollup(self.histograms[source], source,
+                                                       gen_levels)
+            self.rollups += 1
+
+        return self.histograms[gen_levels]
+
+    def non_anonymous(self, gen_levels: tuple, k: int) -> int:
+
+        """
+        Counts the rows of a histogram whose sequence occurs less than k times, with a binary
+        search in its sorted counts.
+
+        :param gen_levels:  Levels of generalization of the histogram.
+        :param k:           Level of anonymity.
+        :return:            Number of rows which are not k-anonymous.
+        """
+
+        if gen_levels not in self._totals:
+            counts = sorted(self.histogram(gen_levels)[1])
+            self._totals[gen_levels] = (counts, list(accumulate(counts, initial=0)))
+        counts, totals = self._totals[gen_levels]
+
+        return totals[bisect_left(counts, k)]
+
+    def cardinalities(self, gen_levels: tuple) -> list:
+
+        """
+        Counts the distinct values of every attribute in a histogram.
+
+        :param gen_levels:  Levels of generalization of the histogram.
+        :return:            List of the cardinalities of the attribute domains.
+        """
+
+        if gen_levels not in self._cardinalities:
+            self._cardinalities[gen_levels] = [
+                len(set(column)) for column in self.histogram(gen_levels)[0]]
+
+        return self._cardinalities[gen_levels]
+
+    def decode(self, gen_levels: tuple, sequence_idx: int) -> tuple:
+
+        """
+        Decodes the Quasi Identifier values of a sequence of a histogram.
+
+        :param gen_levels:      Levels of generalization of the histogram.
+        :param sequence_idx:    Index of the sequence in the histogram.
+        :return:                Tuple of the (generalized) values of the sequence.
+        """
+
+        columns = self.histogram(gen_levels)[0]
+        return tuple(dgh.labels[gen_levels[i]][columns[i][sequence_idx]]
+                     for i, dgh in enumerate(self.dghs))
+
+    def split(self, gen_levels: tuple, k: int) -> tuple:
+
+        """
+        Splits the generalized sequences of a histogram by whether they occur at least k times.
+
+        :param gen_levels:  Levels of generalization of the histogram.
+        :param k:           Level of anonymity.
+        :return:            Couple (set of the sequences which occur at least k times, set of the
+                            ones which occur less), of tuples of values.
+        """
+
+        kept, suppressed = set(), set()
+        for sequence_idx, count in enumerate(self.histogram(gen_levels)[1]):
+            (kept if count >= k else suppressed).add(self.decode(gen_levels, sequence_idx))
+
+        return kept, suppressed
+
+    def _map(self, attribute_idx: int, gen_level: int, target_level: int) -> array:
+
+        """
+        Composes the parent code arrays of an attribute between two levels.
+
+        :param attribute_idx:   Index of the Quasi Identifier attribute.
+        :param gen_level:       Level of the codes to map.
+        :param target_level:    Level of the mapped codes.
+        :return:                Array containing the code on the target level of every code.
+        """
+
+        key = (attribute_idx, gen_level, target_level)
+        if key not in self._maps:
+            dgh = self.dghs[attribute_idx]
+            codes = range(len(dgh.labels[gen_level]))
+            for level in range(gen_level, target_level):
+                codes = array('l', map(dgh.parent_codes[level].__getitem__, codes))
+            self._maps[key] = codes
+            self.lookups += len(codes)
+
+        return self._maps[key]
+
+    def _rollup(self, histogram: tuple, source: tuple, target: tuple) -> tuple:
+
+        """
+        Rolls up a histogram to higher levels of generalization, merging the sequences which end
+        up with the same codes.
+
+        :param histogram:   Couple (code columns, counts) of the histogram.
+        :param source:      Levels of generalization of the histogram.
+        :param target:      Levels of generalization to reach, each one not below the source one.
+        :return:            The rolled up histogram.
+        """
+
+        columns, counts = histogram
+        columns = [column if source[i] == target[i]
+                   else array('l', map(self._map(i, source[i], target[i]).__getitem__, column))
+                   for i, column in enumerate(columns)]
+
+        if not counts:
+            return columns, array('l')
+
+        # Pack the codes of each sequence into a single integer:
+        keys = repeat(0, len(counts))
+        for i, column in enumerate(columns):
+            keys = map(add, map(mul, keys, repeat(len(self.dghs[i].labels[target[i]]))), column)
+        keys = list(keys)
+
+        # Sort the sequences by key, so that the merged ones are contiguous (note: this avoids a
+        # loop over the sequences in Python code):
+        order = sorted(range(len(keys)), key=keys.__getitem__)
+        keys = list(map(keys.__getitem__, order))
+        # Positions in the sorted sequences where each merged sequence starts and ends:
+        starts = [0]
+        starts.extend(compress(range(1, len(keys)), map(ne, islice(keys, 1, None), keys)))
+        ends = starts[1:] + [len(keys)]
+
+        # The count of a merged sequence is the difference of the cumulative counts at its ends:
+        totals = list(accumulate(map(counts.__getitem__, order), initial=0))
+        merged_counts = array('l', map(sub, map(totals.__getitem__, ends),
+                                       map(totals.__getitem__, starts)))
+        firsts = list(map(order.__getitem__, starts))
+
+        return [array('l', map(column.__getitem__, firsts)) for column in columns], merged_counts
+
+
+class Rollup:
+
+    def __init__(self, dghs: list, k: int, histograms=None):
+
+        """
+        Generalizes with the Datafly heuristic as the engine does, but evaluating each vector of
+        levels of generalization on its cached histogram instead of on the equivalence classes of
+        the rows, so that searches with different values of k share the roll ups.
+
+        :param dghs:        List of DGH instances, one for each Quasi Identifier attribute.
+        :param k:           Level of anonymity.
+        :param histograms:  Histograms to share with other searches, None to start new ones.
+        """
+
+        self.dghs = dghs
+        """
+        List of the DGH instances of the Quasi Identifier attributes.
+        """
+
+        self.k = k
+        """
+        Level of anonymity.
+        """
+
+        self.histograms = histograms if histograms is not None else Histograms(dghs)
+        """
+        Histograms of the sequences of Quasi Identifier values.
+        """
+
+        self.gen_levels = [0 for _ in dghs]
+        """
+        List whose elements are, for each Quasi Identifier attribute, the current level of
+        generalization, from 0 (not generalized).
+        """
+
+    def add_sequence(self, values, count=1) -> int:
+
+        """
+        Encodes and adds occurrences of a sequence of (not generalized) Quasi Identifier values.
+
+        :param values:      List of values, one for each Quasi Identifier attribute.
+        :param count:       Number of occurrences to add.
+        :return:            Index of the sequence.
+        :raises KeyError:   If a value is not part of the corresponding domain; its arguments are
+                            the value and the index of the attribute.
+        """
+
+        return self.histograms.add_sequence(values, count)
+
+    def plan(self, stats=None) -> Plan:
+
+        """
+        Generalizes with the Datafly heuristic until at most k rows are not k-anonymous: each
+        time, the attribute with the most distinct values is generalized to the level above.
+
+        :param stats:   Metrics where to record the generalization and the suppression, if given.
+        :return:        The plan with the reached levels of generalization and the sequences to
+                        suppress.
+        """
+
+        if stats is None:
+            stats = Stats(self.k)
+        stats.classes_before = len(self.histograms.counts)
+
+        with stats.phase('generalization'):
+            _datafly(self, stats)
+
+        with stats.phase('suppression'):
+            kept, suppressed = self.histograms.split(tuple(self.gen_levels), self.k)
+        stats.classes_after = len(kept)
+
+        return Plan(self.dghs, list(self.gen_levels), kept, suppressed)
+
+    @property
+    def non_anonymous(self) -> int:
+
+        """
+        Number of rows whose sequence occurs less than k times on the current levels of
+        generalization.
+        """
+
+        return self.histograms.non_anonymous(tuple(self.gen_levels), self.k)
+
+    def can_generalize(self, attribute_idx: int) -> bool:
+
+        """
+        Checks whether an attribute can be generalized further.
+
+        :param attribute_idx:   Index of the Quasi Identifier attribute.
+        :return:                True if the attribute is not on the last level of its DGH.
+        """
+
+        return self.gen_levels[attribute_idx] < len(self.dghs[attribute_idx].parent_codes)
+
+    def generalize(self, attribute_idx: int) -> int:
+
+        """
+        Generalizes an attribute to the level above, rolling up the histogram of the new levels of
+        generalization if it's not cached.
+
+        :param attribute_idx:   Index of the Quasi Identifier attribute to generalize.
+        :return:                Number of values generalized through the DGHs, to compose the
+                                maps of the roll up (0 if they are cached).
+        """
+
+        lookups = self.histograms.lookups
+        self.gen_levels[attribute_idx] += 1
+        self.histograms.histogram(tuple(self.gen_levels))
+
+        return self.histograms.lookups - lookups
+
+    def count_classes(self) -> int:
+
+        """
+        :return:    Number of distinct sequences on the current levels of generalization.
+        """
+
+        return len(self.histograms.histogram(tuple(self.gen_levels))[1])
+
+    def domain_size(self, attribute_idx: int) -> int:
+
+        """
+        Counts the distinct values an attribute has on the current levels of generalization.
+
+        :param attribute_idx:   Index of the Quasi Identifier attribute.
+        :return:                Cardinality of the attribute domain.
+        """
+
+        return self.histograms.cardinalities(tuple(self.gen_levels))[attribute_idx]
+
+
+class Lattice:
+
+    def __init__(self, dghs: list, k: int, histograms=None):
+
+        """
+        Searches the lattice of the vectors of levels of generalization, with a level between 0
+        and the depth of the DGH for each Quasi Identifier attribute, for the k-anonymous node
+        with the minimal information loss. As for the Datafly heuristic, a node is k-anonymous if
+        at most k rows are in equivalence classes with less than k rows.
+
+        Generalizing never increases the number of rows which are not k-anonymous, so once a node
+        is evaluated every generalization of a k-anonymous node is tagged as k-anonymous, and
+        every specialization of a node which is not k-anonymous is tagged as not k-anonymous,
+        without evaluating them. Starting from the lowest node which is not tagged yet, the lowest
+        k-anonymous node on a path up to the top is found by a binary search. A node is evaluated
+        on its histogram, rolled up from the one of a specialization instead of counting the rows
+        again.
+
+        :param dghs:        List of DGH instances, one for each Quasi Identifier attribute.
+        :param k:           Level of anonymity.
+        :param histograms:  Histograms to share with other searches, None to start new ones.
+        """
+
+        self.dghs = dghs
+        """
+        List of the DGH instances of the Quasi Identifier attributes.
+        """
+
+        self.k = k
+        """
+        Level of anonymity.
+        """
+
+        self.depths = [len(dgh.parent_codes) for dgh in dghs]
+        """
+        List whose elements are, for each Quasi Identifier attribute, the highest level of
+        generalization.
+        """
+
+        self.histograms = histograms if histograms is not None else Histograms(dghs)
+        """
+        Histograms of the sequences of Quasi Identifier values.
+        """
+
+        self.anonymous = dict()
+        """
+        Dictionary whose keys are the evaluated nodes (tuples of levels of generalization) and
+        whose values tell whether they are k-anonymous.
+        """
+
+        self.losses = dict()
+        """
+        Dictionary whose keys are the evaluated k-anonymous nodes and whose values are their
+        information losses. After the search, only the k-minimal nodes (without k-anonymous
+        direct specializations) are kept.
+        """
+
+    def add_sequence(self, values, count=1) -> int:
+
+        """
+        Encodes and adds occurrences of a sequence of (not generalized) Quasi Identifier values.
+
+        :param values:      List of values, one for each Quasi Identifier attribute.
+        :param count:       Number of occurrences to add.
+        :return:            Index of the sequence.
+        :raises KeyError:   If a value is not part of the corresponding domain; its arguments are
+                            the value and the index of the attribute.
+        """
+
+        return self.histograms.add_sequence(values, count)
+
+    def search(self) -> tuple:
+
+        """
+        Visits the lattice and finds the k-minimal node with the minimal information loss; ties
+        are broken by the lowest height.
+
+        :return:    The node, or the top of the lattice if no node is k-anonymous.
+        """
+
+        top = tuple(self.depths)
+
+        for node in sorted(product(*(range(depth + 1) for depth in self.depths)), key=sum):
+
+            if self._tag(node) is not None:
+                continue
+
+            # Path from this node up to the top, generalizing one attribute at a time:
+            path = [node]
+            while path[-1] != top:
+                last = path[-1]
+                i = next(i for i, level in enumerate(last) if level < self.depths[i])
+                path.append(last[:i] + (last[i] + 1,) + last[i + 1:])
+
+            # Binary search of the lowest k-anonymous node on the path, which leaves this node
+            # evaluated or tagged:
+            low, high = 0, len(path)
+            while low < high:
+                middle = (low + high) // 2
+                if self._is_anonymous(path[middle]):
+                    high = middle
+                else:
+                    low = middle + 1
+
+        # Only the nodes whose direct specializations are not k-anonymous are k-minimal:
+        for node in list(self.losses):
+            if any(self._tag(node[:i] + (level - 1,) + node[i + 1:])
+                   for i, level in enumerate(node) if level > 0):
+                del self.losses[node]
+
+        if not self.losses:
+            return top
+        return min(self.losses, key=lambda other: (self.losses[other], sum(other), other))
+
+    def plan(self, stats=None) -> Plan:
+
+        """
+        Searches the lattice for the k-anonymous node with the minimal information loss.
+
+        :param stats:   Metrics where to record the search, with an iteration for each evaluated
+                        node, and the suppression, if given.
+        :return:        The plan with the levels of generalization of the node, the sequences to
+                        suppress and the loss.
+        """
+
+        if stats is None:
+            stats = Stats(self.k)
+        stats.classes_before = len(self.histograms.counts)
+
+        lookups = self.histograms.lookups
+        with stats.phase('generalization'):
+            node = self.search()
+        for evaluated in self.anonymous:
+            stats.add_iteration(evaluated, len(self.histograms.histogram(evaluated)[1]))
+        stats.dgh_lookups += self.histograms.lookups - lookups
+
+        with stats.phase('suppression'):
+            kept, suppressed = self.histograms.split(node, self.k)
+        stats.classes_after = len(kept)
+
+        return Plan(self.dghs, list(node), kept, suppressed,
+                    self._loss(self.histograms.histogram(node)[1]))
+
+    def _is_anonymous(self, node: tuple) -> bool:
+
+        """
+        Tells whether a node is k-anonymous, from its tag or evaluating it.
+
+        :param node:    Levels of generalization.
+        :return:        True if at most k rows are in equivalence classes with less than k rows.
+        """
+
+        anonymous = self._tag(node)
+        if anonymous is not None:
+            return anonymous
+
+        anonymous = self.histograms.non_anonymous(node, self.k) <= self.k
+        self.anonymous[node] = anonymous
+        if anonymous:
+            self.losses[node] = self._loss(self.histograms.histogram(node)[1])
+
+        return anonymous
+
+    def _tag(self, node: tuple):
+
+        """
+        Predicts whether a node is k-anonymous from the evaluated ones.
+
+        :param node:    Levels of generalization.
+        :return:        True if it generalizes a k-anonymous node, False if it specializes a node
+                        which is not k-anonymous, None if it can't be predicted.
+        """
+
+        for other, anonymous in self.anonymous.items():
+            if anonymous and all(map(le, other, node)):
+                return True
+            if not anonymous and all(map(le, node, other)):
+                return False
+
+        return None
+
+    def _loss(self, counts) -> int:
+
+        """
+        Measures the information loss of a histogram with the discernibility metric: each row
+        costs the size of its equivalence class, or the number of rows if it's suppressed.
+
+        :param counts:  Array containing the number of rows of every equivalence class.
+        :return:        The loss.
+        """
+
+        anonymous = list(filter(self.k.__le__, counts))
+        suppressed = sum(filter(self.k.__gt__, counts))
+        return sum(map(mul, anonymous, anonymous)) + sum(counts) * suppressed
+
+
+class PartitionPlan:
+
+    def __init__(self, sequences: dict, loss=None):
+
+        """
+        Represents a generalization of a table where each sequence of Quasi Identifier values is
+        generalized on its own (e.g. to the ranges of its partition), instead of on a level of
+        generalization for each attribute. It has the same interface of a plan.
+
+        :param sequences:   Dictionary whose keys are the (not generalized) sequences and whose
+                            values are the generalized ones, None if they are suppressed.
+        :param loss:        Information loss of the generalization, if it has been measured.
+        """
+
+        self.sequences = sequences
+        """
+        Dictionary whose keys are the (not generalized) sequences and whose values are the
+        generalized ones, None if they are suppressed.
+        """
+
+        self.gen_levels = None
+        """
+        Always None, since the attributes have no level of generalization.
+        """
+
+        self.suppressed = set()
+        """
+        Always empty, since the suppressed sequences are in the sequences dictionary.
+        """
+
+        self.loss = loss
+        """
+        Information loss of the generalization, None if it has not been measured.
+        """
+
+        self.lookups = 0
+        """
+        Always 0, since the sequences are generalized without the DGHs.
+        """
+
+    def generalize(self, values):
+
+        """
+        Generalizes a sequence of (not generalized) Quasi Identifier values.
+
+        :param values:      List of values, one for each Quasi Identifier attribute.
+        :return:            Tuple of the generalized values, None if the sequence is suppressed
+                            or if it has not been partitioned.
+        """
+
+        return self.sequences.get(tuple(values))
+
+    def detach(self):
+
+        """
+        :return:    This plan, which does not reference the DGHs.
+        """
+
+        return self
+
+
+class Mondrian:
+
+    def __init__(self, dghs: list, k: int):
+
+        """
+        Partitions the sequences of Quasi Identifier values top-down, with the strict
+        multidimensional Mondrian algorithm: a partition is split on the attribute with the widest
+        normalized range, as long as each part has at least k rows. A numeric attribute is split
+        on the median of its values, a categorical one into the children of the lowest common
+        generalization of its values in the DGH. Each sequence is then generalized to the range
+        of the numeric values and to the common generalization of the categorical values of its
+        partition.
+
+        :param dghs:    List of DGH instances, one for each Quasi Identifier attribute, where None
+                        means that the attribute is numeric.
+        :param k:       Level of anonymity.
+        """
+
+        self.dghs = dghs
+        """
+        List of the DGH instances of the Quasi Identifier attributes, None for the numeric ones.
+        """
+
+        self.k = k
+        """
+        Level of anonymity.
+        """
+
+        self.columns = [array('d') if dgh is None else array('l') for dgh in dghs]
+        """
+        List whose elements are, for each Quasi Identifier attribute, an array containing the
+        numbers (for a numeric attribute) or the codes of the not generalized values (for a
+        categorical one) of every sequence.
+        """
+
+        self.counts = array('l')
+        """
+        Array containing the number of occurrences of every sequence.
+        """
+
+        self.sequences = list()
+        """
+        List containing the (not generalized) values of every sequence.
+        """
+
+        self.partitions = list()
+        """
+        List containing the final partitions, as lists of sequence indices.
+        """
+
+        self._sequences = dict()
+        """
+        Dictionary whose keys are the sequences and whose values are their indices, used while
+        adding sequences.
+        """
+
+        self._domain_widths = list()
+        """
+        List whose elements are, for each Quasi Identifier attribute, the width of the range of
+        its values in the whole table, to normalize the widths of the partitions.
+        """
+
+        self._maps = dict()
+        """
+        Dictionary whose keys are couples (attribute index, level) and whose values are arrays
+        containing the code on that level of every not generalized code.
+        """
+
+        self.lookups = 0
+        """
+        Number of values generalized through the DGHs, to compose the maps.
+        """
+
+    def add_sequence(self, values, count=1) -> int:
+
+        """
+        Adds occurrences of a sequence of (not generalized) Quasi Identifier values.
+
+        :param values:      List of values, one for each Quasi Identifier attribute.
+        :param count:       Number of occurrences to add.
+        :return:            Index of the sequence.
+        :raises KeyError:   If a value is not part of the corresponding domain, or it's not a
+                            number for a numeric attribute; its arguments are the value and the
+                            index of the attribute.
+        """
+
+        values = tuple(values)
+
+        if values in self._sequences:
+            sequence_idx = self._sequences[values]
+            self.counts[sequence_idx] += count
+            return sequence_idx
+
+        encoded = list()
+        for i, value in enumerate(values):
+            try:
+                if self.dghs[i] is None:
+                    encoded.append(float(value))
+                else:
+                    encoded.append(self.dghs[i].codes[0][value])
+            except (KeyError, ValueError):
+                raise KeyError(value, i)
+
+        sequence_idx = len(self.counts)
+        self._sequences[values] = sequence_idx
+        self.sequences.append(values)
+        self.counts.append(count)
+        for column, code in zip(self.columns, encoded):
+            column.append(code)
+
+        return sequence_idx
+
+    def partition(self) -> list:
+
+        """
+        Splits the sequences into partitions of at least k rows each, as long as it's possible.
+
+        :return:    List of the partitions, as lists of sequence indices.
+        """
+
+        self._domain_widths = [self._width(i, range(len(self.counts)))
+                               for i in range(len(self.dghs))]
+
+        self.partitions = list()
+        if sum(self.counts) < self.k:
+            # Every row is suppressed:
+            return self.partitions
+
+        stack = [list(range(len(self.counts)))]
+        while stack:
+            indices = stack.pop()
+            parts = self._split(indices)
+            if parts is None:
+                self.partitions.append(indices)
+            else:
+                stack.extend(parts)
+
+        return self.partitions
+
+    def plan(self, stats=None) -> PartitionPlan:
+
+        """
+        Partitions the sequences and generalizes each one to the values of its partition.
+
+        :param stats:   Metrics where to record the partitioning, if given.
+        :return:        The plan with the generalization of every sequence and the loss.
+        """
+
+        if stats is None:
+            stats = Stats(self.k)
+        stats.classes_before = len(self.counts)
+
+        lookups = self.lookups
+        with stats.phase('generalization'):
+            self.partition()
+        stats.classes_after = len(self.partitions)
+
+        sequences = dict.fromkeys(self.sequences)
+        loss = 0
+        for indices in self.partitions:
+            generalized = self._generalize(indices)
+            for sequence_idx in indices:
+                sequences[self.sequences[sequence_idx]] = generalized
+            rows = sum(map(self.counts.__getitem__, indices))
+            loss += rows * rows
+        # Every row is suppressed if there are no partitions:
+        if not self.partitions:
+            loss = sum(self.counts) ** 2
+        stats.dgh_lookups += self.lookups - lookups
+
+        return PartitionPlan(sequences, loss)
+
+    def _common_level(self, attribute_idx: int, indices) -> int:
+
+        """
+        Finds the lowest level of generalization on which the categorical values of some
+        sequences are the same.
+
+        :param attribute_idx:   Index of the categorical attribute.
+        :param indices:         Indices of the sequences.
+        :return:                The level.
+        """
+
+        column = self.columns[attribute_idx]
+        for gen_level in range(len(self.dghs[attribute_idx].labels)):
+            codes = map(self._map(attribute_idx, gen_level).__getitem__,
+                        map(column.__getitem__, indices))
+            first = next(codes)
+            if all(map(first.__eq__, codes)):
+                return gen_level
+
+        return len(self.dghs[attribute_idx].labels) - 1
+
+    def _generalize(self, indices) -> tuple:
+
+        """
+        Generalizes the sequences of a partition.
+
+        :param indices: Indices of the sequences.
+        :return:        Tuple of the generalized values: ranges of the numeric values and lowest
+                        common generalizations of the categorical ones.
+        """
+
+        values = list()
+        for i, (dgh, column) in enumerate(zip(self.dghs, self.columns)):
+            if dgh is None:
+                low = min(indices, key=column.__getitem__)
+                high = max(indices, key=column.__getitem__)
+                if column[low] == column[high]:
+                    values.append(self.sequences[low][i])
+                else:
+                    values.append('%s-%s' % (self.sequences[low][i], self.sequences[high][i]))
+            else:
+                gen_level = self._common_level(i, indices)
+                values.append(dgh.labels[gen_level][self._map(i, gen_level)[column[indices[0]]]])
+
+        return tuple(values)
+
+    def _map(self, attribute_idx: int, gen_level: int) -> array:
+
+        """
+        Composes the parent code arrays of a categorical attribute up to a level.
+
+        :param attribute_idx:   Index of the categorical attribute.
+        :param gen_level:       Level of the mapped codes.
+        :return:                Array containing the code on the level of every not generalized
+                                code.
+        """
+
+        key = (attribute_idx, gen_level)
+        if key not in self._maps:
+            dgh = self.dghs[attribute_idx]
+            codes = range(len(dgh.labels[0]))
+            for level in range(gen_level):
+                codes = array('l', map(dgh.parent_codes[level].__getitem__, codes))
+            self._maps[key] = codes
+            # Note: the codes on level 0 are not generalized:
+            if gen_level > 0:
+                self.lookups += len(codes)
+
+        return self._maps[key]
+
+    def _split(self, indices: list):
+
+        """
+        Splits a partition on the attribute with the widest normalized range which allows it.
+
+        :param indices: Indices of the sequences of the partition.
+        :return:        List of the parts, as lists of sequence indices, or None if the partition
+                        can't be split.
+        """
+
+        widths = sorted(((self._width(i, indices) / (self._domain_widths[i] or 1), i)
+                         for i in range(len(self.dghs))), reverse=True)
+
+        for width, i in widths:
+            if width == 0:
+                break
+            if self.dghs[i] is None:
+                parts = self._split_numeric(i, indices)
+            else:
+                parts = self._split_categorical(i, indices)
+            if parts is not None:
+                return parts
+
+        return None
+
+    def _split_categorical(self, attribute_idx: int, indices: list):
+
+        """
+        Splits a partition into the children of the lowest common generalization of the values of
+        a categorical attribute.
+
+        :param attribute_idx:   Index of the categorical attribute.
+        :param indices:         Indices of the sequences of the partition.
+        :return:                List of the parts, or None if a part would have less than k rows.
+        """
+
+        gen_level = self._common_level(attribute_idx, indices)
+        if gen_level == 0:
+            return None
+
+        # Group the sequences by their value on the level below:
+        children = self._map(attribute_idx, gen_level - 1)
+        column = self.columns[attribute_idx]
+        parts = dict()
+        for sequence_idx in indices:
+            parts.setdefault(children[column[sequence_idx]], list()).append(sequence_idx)
+
+        parts = list(parts.values())
+        for part in parts:
+            if sum(map(self.counts.__getitem__, part)) < self.k:
+                return None
+
+        return parts
+
+    def _split_numeric(self, attribute_idx: int, indices: list):
+
+        """
+        Splits a partition on the median of the values of a numeric attribute: the values not
+        above the median on one side, the others on the other one. If that leaves less than k rows
+        on a side, the values below the median are tried on one side instead.
+
+        :param attribute_idx:   Index of the numeric attribute.
+        :param indices:         Indices of the sequences of the partition.
+        :return:                List of the two parts, or None if a part would have less than k
+                                rows.
+        """
+
+        column = self.columns[attribute_idx]
+        ordered = sorted(indices, key=column.__getitem__)
+        values = list(map(column.__getitem__, ordered))
+        # Cumulative number of rows up to each sorted sequence:
+        totals = list(accumulate(map(self.counts.__getitem__, ordered)))
+        rows = totals[-1]
+        median = values[bisect_left(totals, (rows + 1) // 2)]
+
+        for split in (bisect_right(values, median), bisect_left(values, median)):
+            if 0 < split < len(ordered) and totals[split - 1] >= self.k \
+                    and rows - totals[split - 1] >= self.k:
+                return [ordered[:split], ordered[split:]]
+
+        return None
+
+    def _width(self, attribute_idx: int, indices) -> float:
+
+        """
+        Measures the range of the values of an attribute in some sequences: the difference
+        between the max and the min for a numeric attribute, the number of distinct values for a
+        categorical one.
+
+        :param attribute_idx:   Index of the attribute.
+        :param indices:         Indices of the sequences.
+        :return:                The width of the range.
+        """
+
+        values = list(map(self.columns[attribute_idx].__getitem__, indices))
+        if not values:
+            return 0
+        if self.dghs[attribute_idx] is None:
+            return max(values) - min(values)
+        return len(set(values)) - 1
@@ -0,0 +1,137 @@
+import argparse
+import csv
+import os
+import random
+import sys
+from itertools import accumulate
+from datafly import _positive_int
+from dgh import CsvDGH
+
+
+_EXAMPLE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'example')
+"""
+Directory of the example tables and generalization files.
+"""
+
+_QI_NAMES = ['age', 'city_birth', 'zip_code']
+"""
+Names of the Quasi Identifiers of the example tables, which have a generalization file each.
+"""
+
+_DISEASES = ['Cancer', 'Heart disease', 'Autism', "Alzheimer's disease", 'Anorexia', 'AIDS']
+"""
+Values of the sensitive attribute of the example tables.
+"""
+
+_CHUNK_SIZE = 100000
+"""
+Number of rows sampled and written on the output file at once.
+"""
+
+
+def _cum_weights(n: int, skew: float) -> list:
+
+    """
+    Computes the cumulative weights of a Zipf distribution.
+
+    :param n:       Number of values.
+    :param skew:    Exponent of the distribution, where 0 means it's uniform.
+    :return:        List of the cumulative weights of the values, from the most frequent one.
+    """
+
+    return list(accumulate(rank ** -skew for rank in range(1, n + 1)))
+
+
+def generate(output_path: str, rows: int, dgh_paths: dict, skew=0.0, cardinality=None, seed=None,
+             chunk_size=_CHUNK_SIZE, dgh_cache=None):
+
+    """
+    Writes a table with the schema of the example tables, whose QI values are the values not
+    generalized of the generalization files. The values of each attribute are sampled
+    independently.
+
+    :param output_path: Path to the output file.
+    :param rows:        Number of rows.
+    :param dgh_paths:   Dictionary whose keys are the QI attribute names and whose values are the
+                        paths to the corresponding generalization files.
+    :param skew:        Exponent of the Zipf distribution of the values of each QI attribute,
+                        where 0 means they are uniform.
+    :param cardinality: If given, maximum number of distinct values of each QI attribute, chosen at
+                        random among the ones of its generalization file.
+    :param seed:        Seed of the random generator, so that the same table can be written again.
+    :param chunk_size:  Number of rows sampled and written at once.
+    :param dgh_cache:   Directory of the compiled generalization files.
+    :raises ValueError:         If the number of rows, the cardinality or the chunk size is not
+                                positive.
+    :raises FileNotFoundError:  If a generalization file is not found.
+    :raises IOError:            If a file cannot be read or written.
+    """
+
+    if rows < 1:
+        raise ValueError("The number of rows must be a positive integer.")
+    if cardinality is not None and cardinality < 1:
+        raise ValueError("The cardinality must be a positive integer.")
+    if chunk_size < 1:
+        raise ValueError("The chunk size must be a positive integer.")
+
+    rng = random.Random(seed)
+
+    # Values of each QI attribute, from the most frequent one, with their cumulative weights:
+    domains = list()
+    for attribute in _QI_NAMES:
+        values = list(CsvDGH(dgh_paths[attribute], dgh_cache).labels[0])
+        # Note: the ranks of the values are random, not their order in the generalization file:
+        rng.shuffle(values)
+        if cardinality is not None:
+            values = values[:cardinality]
+        domains.append((values, _cum_weights(len(values), skew)))
+
+    with open(output_path, 'w', newline='') as output:
+        writer = csv.writer(output)
+        writer.writerow(['id'] + _QI_NAMES + ['disease'])
+
+        for start in range(0, rows, chunk_size):
+            size = min(chunk_size, rows - start)
+            columns = [rng.choices(values, cum_weights=cum_weights, k=size)
+                       for values, cum_weights in domains]
+            columns.append(rng.choices(_DISEASES, k=size))
+            writer.writerows(zip(range(start + 1, start + size + 1), *columns))
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(
+        description="Generates a table with the schema of the example tables, whose Quasi "
+                    "Identifier values are all part of the generalization files.")
+    parser.add_argument("--rows", "-r", required=True,
+                        type=_positive_int, help="Number of rows of the table.")
+    parser.add_argument("--output", "-o", required=True,
+                        type=str, help="Path to the output file.")
+    parser.add_argument("--domain_gen_hierarchies", "-dgh", type=str, default=None, nargs=3,
+                        help="Paths to the generalization files of age, city_birth and zip_code "
+                             "(default: the example ones).")
+    parser.add_argument("--skew", "-s", type=float, default=0.0,
+                        help="Exponent of the Zipf distribution of the Quasi Identifier values "
+                             "(0 for uniform values, as in the example tables).")
+    parser.add_argument("--cardinality", type=_positive_int, default=None,
+                        help="Maximum number of distinct values of each Quasi Identifier.")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="Seed of the random generator.")
+    parser.add_argument("--chunk_size", "-c", type=_positive_int, default=_CHUNK_SIZE,
+                        help="Number of rows sampled and written at once.")
+    parser.add_argument("--dgh_cache", type=str, default=None,
+                        help="Directory where to keep the compiled generalization files.")
+    args = parser.parse_args()
+
+    dgh_paths = dict(zip(_QI_NAMES, args.domain_gen_hierarchies or [
+        os.path.join(_EXAMPLE_DIR, '%s_generalization.csv' % qi_name) for qi_name in _QI_NAMES]))
+
+    try:
+        generate(args.output, args.rows, dgh_paths, args.skew, args.cardinality, args.seed,
+                 args.chunk_size, args.dgh_cache)
+    except FileNotFoundError as error:
+        print("[ERROR] File '%s' has not been found." % error.filename)
+        sys.exit(2)
+    except IOError as error:
+        print("[ERROR] There has been an error with file '%s'." % error.filename)
+        sys.exit(2)
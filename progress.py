@@ -0,0 +1,162 @@
+import sys
+import time
+
+
+_INTERVAL = 1.0
+"""
+Minimum number of seconds between two updates of a progress line.
+"""
+
+_STEP = 1 << 12
+"""
+Number of items processed between two readings of the clock.
+"""
+
+
+class Progress:
+
+    def __init__(self, label: str, total=None, enabled=True, interval=_INTERVAL, unit='rows'):
+
+        """
+        Reports the progress of a long loop on a single line, rewritten in place at most once per
+        interval with the number of items processed, the throughput and, if the total is known,
+        the estimated time left. The clock is only read every few thousands items, so the cost
+        per item is a counter increment.
+
+        :param label:       Description of the loop, at the start of the line.
+        :param total:       Number of items to process, if it's known.
+        :param enabled:     If False nothing is printed and the items are not even counted.
+        :param interval:    Minimum number of seconds between two updates of the line.
+        :param unit:        Name of the items, in the plural.
+        """
+
+        self.label = label
+        """
+        Description of the loop, at the start of the line.
+        """
+
+        self.total = total
+        """
+        Number of items to process, None if it's not known.
+        """
+
+        self.enabled = enabled
+        """
+        If False nothing is printed.
+        """
+
+        self.interval = interval
+        """
+        Minimum number of seconds between two updates of the line.
+        """
+
+        self.count = 0
+        """
+        Number of items processed.
+        """
+
+        self.unit = unit
+        """
+        Name of the items, in the plural.
+        """
+
+        self._start = time.perf_counter()
+        """
+        Time when the loop started.
+        """
+
+        self._last = self._start
+        """
+        Time of the last update of the line.
+        """
+
+        self._width = 0
+        """
+        Length of the last line printed, to blank it out when the next one is shorter.
+        """
+
+    def track(self, items):
+
+        """
+        Wraps an iterable, reporting the progress while it's consumed; the final line is printed
+        when it's exhausted.
+
+        :param items:   Iterable of the items to process.
+        :return:        Iterator over the same items, or the iterable itself if not enabled.
+        """
+
+        if not self.enabled:
+            return items
+        return self._track(items)
+
+    def update(self, count: int):
+
+        """
+        Sets the number of items processed, rewriting the line if the interval has elapsed.
+
+        :param count:   Number of items processed.
+        """
+
+        self.count = count
+        if not self.enabled:
+            return
+
+        now = time.perf_counter()
+        if now - self._last < self.interval:
+            return
+        self._last = now
+
+        elapsed = now - self._start
+        rate = count / elapsed if elapsed else 0
+        line = "[LOG] %s: %d" % (self.label, count)
+        if self.total:
+            line += "/%d" % self.total
+        line += " %s (%d %s/s" % (self.unit, rate, self.unit)
+        if self.total and rate:
+            line += ", ETA %d s" % max((self.total - count) / rate, 0)
+        self._write(line + ")")
+
+    def close(self):
+
+        """
+        Prints the final line, with the number of items processed and the throughput.
+        """
+
+        if not self.enabled:
+            return
+
+        elapsed = time.perf_counter() - self._start
+        rate = self.count / elapsed if elapsed else 0
+        self._write("[LOG] %s: %d %s in %.2f s (%d %s/s)." %
+                    (self.label, self.count, self.unit, elapsed, rate, self.unit))
+        sys.stdout.write('\n')
+        sys.stdout.flush()
+
+    def _track(self, items):
+
+        """
+        Generator behind track, which counts the items and only checks the clock every few
+        thousands of them.
+
+        :param items:   Iterable of the items to process.
+        """
+
+        count = self.count
+        for count, item in enumerate(items, count + 1):
+            yield item
+            if not count % _STEP:
+                self.update(count)
+        self.count = count
+        self.close()
+
+    def _write(self, line: str):
+
+        """
+        Rewrites the progress line.
+
+        :param line:    New content of the line.
+        """
+
+        sys.stdout.write('\r' + line.ljust(self._width))
+        sys.stdout.flush()
+        self._width = len(line)
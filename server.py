@@ -0,0 +1,457 @@
+import argparse
+import asyncio
+import itertools
+import json
+import multiprocessing
+import os
+import signal
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from dgh import CsvDGH
+from datafly import ALGORITHMS, CsvTable
+
+
+_HISTORY = 1000
+"""
+Maximum number of finished jobs whose status is kept.
+"""
+
+_REASONS = {200: 'OK', 202: 'Accepted', 400: 'Bad Request', 404: 'Not Found',
+            405: 'Method Not Allowed', 500: 'Internal Server Error', 503: 'Service Unavailable'}
+"""
+Dictionary whose keys are the HTTP status codes of the responses and whose values are the
+corresponding reason phrases.
+"""
+
+_DGHS = dict()
+"""
+Dictionary of the DGHs resident in a worker process, whose keys are the paths to the DGH files and
+whose values are couples (stamp of the file, DGH instance).
+"""
+
+_DGH_CACHE = None
+"""
+Directory of the compiled DGH files of a worker process, None if they are not used.
+"""
+
+
+def _load_dgh(dgh_path: str):
+
+    """
+    Gets a DGH from the ones resident in this process, loading it again if its file has changed.
+
+    :param dgh_path:            Path to the DGH file.
+    :return:                    The DGH instance.
+    :raises FileNotFoundError:  If the file is not found.
+    :raises IOError:            If the file cannot be read.
+    """
+
+    stat = os.stat(dgh_path)
+    stamp = (stat.st_mtime_ns, stat.st_size)
+    key = os.path.abspath(dgh_path)
+
+    if key not in _DGHS or _DGHS[key][0] != stamp:
+        _DGHS[key] = (stamp, CsvDGH(dgh_path, _DGH_CACHE))
+
+    return _DGHS[key][1]
+
+
+def _init_worker(dgh_paths: list, dgh_cache=None):
+
+    """
+    Initializes a worker process, loading the DGHs which are used by most jobs.
+
+    :param dgh_paths:   List of paths to the DGH files to load.
+    :param dgh_cache:   Directory of the compiled DGH files.
+    """
+
+    global _DGH_CACHE
+
+    _DGH_CACHE = dgh_cache
+    for dgh_path in dgh_paths:
+        _load_dgh(dgh_path)
+
+
+def _ready() -> int:
+
+    """
+    Does nothing, so that submitting it starts a worker process (the pool starts them on demand).
+
+    :return:    Identifier of the worker process.
+    """
+
+    return os.getpid()
+
+
+class _ResidentTable(CsvTable):
+
+    def _add_dgh(self, dgh_path, attribute):
+
+        self.dghs[attribute] = _load_dgh(dgh_path)
+
+
+def _run_job(request: dict) -> list:
+
+    """
+    Anonymizes a table as the command line does, with the DGHs resident in the worker process.
+
+    :param request: Dictionary of the job parameters, validated.
+    :return:        List of the metrics of the anonymization, one for each value of k.
+    :raises KeyError:   If a QI attribute name is not valid, or if a value is not part of the
+                        corresponding domain (then its arguments are the value and the index of
+                        the attribute).
+    :raises IOError:    If a file cannot be read or written.
+    """
+
+    qi_names = request['quasi_identifier']
+    categorical = [qi_name for qi_name in qi_names if qi_name not in request['numeric']]
+    dgh_paths = dict(zip(categorical, request['domain_gen_hierarchies']))
+    table = _ResidentTable(request['private_table'], dgh_paths, request['mmap'])
+
+    ks = request['k']
+    sweep_stats = dict()
+    if len(ks) == 1:
+        plans = {ks[0]: None}
+        output_paths = {ks[0]: request['output']}
+    else:
+        plans = table.sweep(qi_names, ks, chunk_size=request['chunk_size'],
+                            algorithm=request['algorithm'], stats=sweep_stats)
+        output_root, output_ext = os.path.splitext(request['output'])
+        output_paths = dict((k, "%s_k%d%s" % (output_root, k, output_ext)) for k in ks)
+
+    stats = list()
+    for k in ks:
+        stats.append(table.anonymize(qi_names, k, output_paths[k], v=False,
+                                     chunk_size=request['chunk_size'],
+                                     algorithm=request['algorithm'], plan=plans[k],
+                                     stats=sweep_stats.get(k)))
+
+    return [element.to_dict() for element in stats]
+
+
+def _validate(request) -> dict:
+
+    """
+    Checks the parameters of a job, filling the optional ones with their defaults.
+
+    :param request:     Decoded JSON body of the request.
+    :return:            Dictionary of the job parameters.
+    :raises ValueError: If a parameter is missing or not valid.
+    """
+
+    if not isinstance(request, dict):
+        raise ValueError("The job must be a JSON object.")
+
+    for name in ('private_table', 'quasi_identifier', 'domain_gen_hierarchies', 'k', 'output'):
+        if name not in request:
+            raise ValueError("Parameter '%s' is missing." % name)
+
+    job = dict(private_table=request['private_table'], output=request['output'],
+               quasi_identifier=request['quasi_identifier'],
+               domain_gen_hierarchies=request['domain_gen_hierarchies'],
+               k=request['k'] if isinstance(request['k'], list) else [request['k']],
+               algorithm=request.get('algorithm', 'datafly'),
+               numeric=request.get('numeric', []), chunk_size=request.get('chunk_size'),
+               mmap=bool(request.get('mmap', False)))
+
+    for name in ('private_table', 'output'):
+        if not isinstance(job[name], str):
+            raise ValueError("Parameter '%s' must be a path." % name)
+    for name in ('quasi_identifier', 'domain_gen_hierarchies', 'numeric'):
+        if not isinstance(job[name], list) or not all(isinstance(value, str)
+                                                       for value in job[name]):
+            raise ValueError("Parameter '%s' must be a list of strings." % name)
+    if not job['quasi_identifier']:
+        raise ValueError("Parameter 'quasi_identifier' must not be empty.")
+    # Note: bool is a subclass of int, but true and false are not sizes:
+    if not job['k'] or not all(type(k) is int and k > 0 for k in job['k']):
+        raise ValueError("Parameter 'k' must be a positive integer or a list of them.")
+    if job['algorithm'] not in ALGORITHMS:
+        raise ValueError("Parameter 'algorithm' must be one of %s." % ", ".join(ALGORITHMS))
+    if job['numeric'] and job['algorithm'] != 'mondrian':
+        raise ValueError("Parameter 'numeric' is only valid with the algorithm 'mondrian'.")
+    if job['chunk_size'] is not None and not (type(job['chunk_size']) is int and
+                                              job['chunk_size'] > 0):
+        raise ValueError("Parameter 'chunk_size' must be a positive integer.")
+    if len(job['domain_gen_hierarchies']) != len(
+            [qi_name for qi_name in job['quasi_identifier'] if qi_name not in job['numeric']]):
+        raise ValueError("There must be a DGH for each Quasi Identifier which is not numeric.")
+
+    return job
+
+
+class Server:
+
+    def __init__(self, workers: int, max_queued: int, dgh_paths=None, dgh_cache=None):
+
+        """
+        Runs anonymization jobs, received through HTTP requests with a JSON body, on a bounded
+        pool of worker processes. Each worker keeps the DGHs it has loaded, so that the jobs on the
+        same hierarchies don't parse them again.
+
+        :param workers:     Number of worker processes, i.e. of jobs running at once.
+        :param max_queued:  Maximum number of jobs waiting for a worker; more are rejected.
+        :param dgh_paths:   List of paths to the DGH files to load in every worker at startup.
+        :param dgh_cache:   Directory of the compiled DGH files.
+        """
+
+        self.workers = workers
+        """
+        Number of worker processes, i.e. of jobs running at once.
+        """
+
+        self.max_queued = max_queued
+        """
+        Maximum number of jobs waiting for a worker.
+        """
+
+        self.jobs = OrderedDict()
+        """
+        Dictionary whose keys are the job identifiers, in order of submission, and whose values
+        are dictionaries with the status of each job.
+        """
+
+        self.executor = ProcessPoolExecutor(
+            workers, mp_context=multiprocessing.get_context('spawn'), initializer=_init_worker,
+            initargs=(dgh_paths or [], dgh_cache))
+        """
+        Pool of the worker processes.
+        """
+
+        self._ids = itertools.count(1)
+        """
+        Counter of the job identifiers.
+        """
+
+        self._slots = None
+        """
+        Semaphore of the free workers, created on the event loop.
+        """
+
+    async def serve(self, host=None, port=None, unix_path=None):
+
+        """
+        Starts every worker process, loading its DGHs, then accepts requests until cancelled or
+        interrupted by a signal, on a TCP port or on a Unix socket. Then the queued jobs are
+        dropped and the running ones are waited for.
+
+        :param host:        Host name or address to listen on.
+        :param port:        TCP port to listen on.
+        :param unix_path:   Path of the Unix socket to listen on, instead of the TCP port.
+        """
+
+        self._slots = asyncio.Semaphore(self.workers)
+
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(signum, asyncio.current_task().cancel)
+            except NotImplementedError:
+                # Not available on Windows, where only KeyboardInterrupt stops the server:
+                pass
+
+        try:
+            # Note: the pool starts a worker only when a job is submitted and no worker is idle, so
+            # the workers are started at once before the first job:
+            await asyncio.gather(*(loop.run_in_executor(self.executor, _ready)
+                                   for _ in range(self.workers)))
+
+            if unix_path is not None:
+                server = await asyncio.start_unix_server(self._handle, unix_path)
+            else:
+                server = await asyncio.start_server(self._handle, host, port)
+
+            async with server:
+                await server.serve_forever()
+        finally:
+            # Note: the running jobs are waited for in another thread, so that the event loop
+            # can still record their status:
+            await asyncio.to_thread(self.executor.shutdown, cancel_futures=True)
+            if unix_path is not None and os.path.exists(unix_path):
+                os.remove(unix_path)
+
+    def status(self) -> dict:
+
+        """
+        :return:    Dictionary with the number of jobs in each status and the size of the pool.
+        """
+
+        counts = dict((status, 0) for status in ('queued', 'running', 'done', 'failed'))
+        for job in self.jobs.values():
+            counts[job['status']] += 1
+
+        return dict(workers=self.workers, max_queued=self.max_queued, jobs=counts)
+
+    def submit(self, request: dict) -> dict:
+
+        """
+        Queues a job.
+
+        :param request:     Dictionary of the job parameters, validated.
+        :return:            Dictionary with the status of the job.
+        :raises OverflowError:  If too many jobs are waiting for a worker.
+        """
+
+        if sum(job['status'] == 'queued' for job in self.jobs.values()) >= self.max_queued:
+            raise OverflowError(self.max_queued)
+
+        job = dict(id=str(next(self._ids)), status='queued', request=request,
+                   submitted=time.time(), started=None, finished=None, stats=None, error=None)
+        self.jobs[job['id']] = job
+        asyncio.get_running_loop().create_task(self._run(job))
+        self._forget()
+
+        return job
+
+    async def _run(self, job: dict):
+
+        """
+        Waits for a free worker and runs a job on it, updating its status.
+
+        :param job: Dictionary with the status of the job.
+        """
+
+        async with self._slots:
+            job['status'], job['started'] = 'running', time.time()
+            try:
+                job['stats'] = await asyncio.get_running_loop().run_in_executor(
+                    self.executor, _run_job, job['request'])
+                job['status'] = 'done'
+            except KeyError as error:
+                job['status'] = 'failed'
+                qi_names = job['request']['quasi_identifier']
+                if len(error.args) > 1:
+                    job['error'] = "Value '%s' is not in hierarchy for attribute '%s'." % \
+                                   (error.args[0], qi_names[error.args[1]])
+                else:
+                    job['error'] = "Quasi Identifier '%s' is not valid." % \
+                                   (error.args[0] if error.args else '')
+            except FileNotFoundError as error:
+                job['status'], job['error'] = 'failed', \
+                    "File '%s' has not been found." % error.filename
+            except Exception as error:
+                job['status'], job['error'] = 'failed', "%s: %s" % (type(error).__name__, error)
+            finally:
+                job['finished'] = time.time()
+
+    def _forget(self):
+
+        """
+        Removes the oldest finished jobs beyond the history size.
+        """
+
+        finished = [job_id for job_id, job in self.jobs.items()
+                    if job['status'] in ('done', 'failed')]
+        for job_id in finished[:max(len(finished) - _HISTORY, 0)]:
+            del self.jobs[job_id]
+
+    def _route(self, method: str, path: str, body: bytes) -> tuple:
+
+        """
+        Handles a request.
+
+        :param method:  HTTP method of the request.
+        :param path:    Path of the request.
+        :param body:    Body of the request.
+        :return:        Couple (HTTP status code, JSON-serializable content of the response).
+        """
+
+        parts = [part for part in path.split('?', 1)[0].split('/') if part]
+
+        if parts == ['status']:
+            if method != 'GET':
+                return 405, dict(error="Use GET.")
+            return 200, self.status()
+
+        if parts == ['jobs']:
+            if method == 'GET':
+                return 200, list(self.jobs.values())
+            if method != 'POST':
+                return 405, dict(error="Use GET or POST.")
+            try:
+                request = _validate(json.loads(body or b'null'))
+            except ValueError as error:
+                return 400, dict(error=str(error))
+            try:
+                return 202, self.submit(request)
+            except OverflowError:
+                return 503, dict(error="Too many jobs are queued.")
+
+        if len(parts) == 2 and parts[0] == 'jobs':
+            if method != 'GET':
+                return 405, dict(error="Use GET.")
+            if parts[1] not in self.jobs:
+                return 404, dict(error="Job '%s' has not been found." % parts[1])
+            return 200, self.jobs[parts[1]]
+
+        return 404, dict(error="Path '%s' has not been found." % path)
+
+    async def _handle(self, reader, writer):
+
+        """
+        Reads an HTTP request from a connection and writes the response, then closes it.
+
+        :param reader:  Stream of the request.
+        :param writer:  Stream of the response.
+        """
+
+        try:
+            request_line = await reader.readline()
+            method, path, _ = request_line.decode('latin-1').split(' ', 2)
+            headers = dict()
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b'\n', b''):
+                    break
+                name, _, value = line.decode('latin-1').partition(':')
+                headers[name.strip().lower()] = value.strip()
+            body = await reader.readexactly(int(headers.get('content-length', 0)))
+            status, content = self._route(method, path, body)
+        except (ValueError, asyncio.IncompleteReadError):
+            status, content = 400, dict(error="The request is not valid.")
+        except Exception as error:
+            status, content = 500, dict(error="%s: %s" % (type(error).__name__, error))
+
+        payload = json.dumps(content, indent=2).encode()
+        writer.write(b"HTTP/1.1 %d %s\r\nContent-Type: application/json\r\n"
+                     b"Content-Length: %d\r\nConnection: close\r\n\r\n" %
+                     (status, _REASONS[status].encode(), len(payload)) + payload)
+        try:
+            await writer.drain()
+        finally:
+            writer.close()
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(
+        description="Server of anonymization jobs, which keeps the generalization files loaded "
+                    "between jobs. Jobs are submitted with POST /jobs and a JSON body with the "
+                    "same parameters of the command line, and their status is read with GET "
+                    "/jobs/<id>.")
+    parser.add_argument("--host", type=str, default='127.0.0.1',
+                        help="Host name or address to listen on.")
+    parser.add_argument("--port", "-p", type=int, default=8080,
+                        help="TCP port to listen on.")
+    parser.add_argument("--unix", type=str, default=None,
+                        help="Path of a Unix socket to listen on, instead of the TCP port.")
+    parser.add_argument("--workers", "-w", type=int, default=os.cpu_count() or 1,
+                        help="Number of worker processes, i.e. of jobs running at once.")
+    parser.add_argument("--max_queued", type=int, default=100,
+                        help="Maximum number of jobs waiting for a worker; more are rejected.")
+    parser.add_argument("--domain_gen_hierarchies", "-dgh", type=str, default=[], nargs='+',
+                        help="Paths to the generalization files to load in every worker at "
+                             "startup.")
+    parser.add_argument("--dgh_cache", type=str, default=None,
+                        help="Directory where to keep the compiled generalization files.")
+    args = parser.parse_args()
+
+    server = Server(args.workers, args.max_queued, args.domain_gen_hierarchies, args.dgh_cache)
+    print("[LOG] Listening on %s with %d workers." %
+          (args.unix or "%s:%d" % (args.host, args.port), args.workers))
+    try:
+        asyncio.run(server.serve(args.host, args.port, args.unix))
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        pass
+    print("[LOG] Stopped.")
@@ -0,0 +1,158 @@
+import json
+import time
+from contextlib import contextmanager
+
+
+class Stats:
+
+    def __init__(self, k=None, algorithm=None):
+
+        """
+        Collects the metrics of an anonymization: the duration of each phase (ingest of the QI
+        sequences, generalization, suppression and write of the output file), each iteration of
+        the generalization, and the counters of rows, equivalence classes and DGH lookups.
+
+        :param k:           Level of anonymity.
+        :param algorithm:   Name of the generalization algorithm.
+        """
+
+        self.k = k
+        """
+        Level of anonymity.
+        """
+
+        self.algorithm = algorithm
+        """
+        Name of the generalization algorithm.
+        """
+
+        self.durations = dict()
+        """
+        Dictionary whose keys are the names of the phases, in the order they started, and whose
+        values are their durations in seconds.
+        """
+
+        self.iterations = list()
+        """
+        List whose elements are, for each iteration of the generalization, a dictionary with the
+        levels of generalization it reached and the metrics of the equivalence classes.
+        """
+
+        self.rows = 0
+        """
+        Number of rows of the table.
+        """
+
+        self.rows_written = 0
+        """
+        Number of rows written on the output file.
+        """
+
+        self.rows_suppressed = 0
+        """
+        Number of rows suppressed, i.e. not written on the output file.
+        """
+
+        self.classes_before = 0
+        """
+        Number of equivalence classes before the generalization, i.e. of distinct QI sequences.
+        """
+
+        self.classes_after = 0
+        """
+        Number of equivalence classes after the generalization, without the suppressed ones.
+        """
+
+        self.merges = 0
+        """
+        Number of merges of two equivalence classes during the generalization.
+        """
+
+        self.dgh_lookups = 0
+        """
+        Number of values generalized through a DGH, i.e. through its parent code arrays: the codes
+        of the equivalence classes, the codes of the maps of the histogram roll ups, and the
+        values of the look up tables of the plan.
+        """
+
+        self.dgh_cache_hits = 0
+        """
+        Number of values of the rows generalized from the look up tables of the plan instead of
+        through a DGH. The rows written from their equivalence classes are not generalized again.
+        """
+
+    @contextmanager
+    def phase(self, name: str):
+
+        """
+        Times a phase, adding its duration to the one of the phase with the same name.
+
+        :param name:    Name of the phase.
+        """
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.durations[name] = self.durations.get(name, 0) + time.perf_counter() - start
+
+    def add_iteration(self, gen_levels, classes: int, merges=0, duration=None, dgh_lookups=0):
+
+        """
+        Records an iteration of the generalization.
+
+        :param gen_levels:  Levels of generalization reached by the iteration.
+        :param classes:     Number of equivalence classes after the iteration.
+        :param merges:      Number of merges of two equivalence classes during the iteration.
+        :param duration:    Duration of the iteration in seconds, if it has been measured.
+        :param dgh_lookups: Number of values generalized through a DGH during the iteration.
+        """
+
+        self.iterations.append(dict(gen_levels=list(gen_levels), classes=classes, merges=merges,
+                                    duration=duration))
+        self.merges += merges
+        self.dgh_lookups += dgh_lookups
+
+    def rows_per_second(self, name: str) -> float:
+
+        """
+        Measures the throughput of a phase.
+
+        :param name:    Name of the phase.
+        :return:        Number of rows of the table processed per second, None if the phase has
+                        not been timed.
+        """
+
+        duration = self.durations.get(name)
+        if not duration:
+            return None
+        return self.rows / duration
+
+    def to_dict(self) -> dict:
+
+        """
+        :return:    Dictionary of the metrics, which can be serialized to JSON.
+        """
+
+        return dict(k=self.k, algorithm=self.algorithm, durations=dict(self.durations),
+                    rows_per_second=dict((name, self.rows_per_second(name))
+                                         for name in self.durations),
+                    iterations=list(self.iterations), rows=self.rows,
+                    rows_written=self.rows_written, rows_suppressed=self.rows_suppressed,
+                    classes_before=self.classes_before, classes_after=self.classes_after,
+                    merges=self.merges, dgh_lookups=self.dgh_lookups,
+                    dgh_cache_hits=self.dgh_cache_hits)
+
+    @staticmethod
+    def write(stats: list, path: str):
+
+        """
+        Writes the metrics of some anonymizations on a JSON file.
+
+        :param stats:       List of the metrics.
+        :param path:        Path to the JSON file.
+        :raises IOError:    If the file cannot be written.
+        """
+
+        with open(path, 'w') as file:
+            json.dump([element.to_dict() for element in stats], file, indent=2)
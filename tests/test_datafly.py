@@ -0,0 +1,160 @@
+import csv
+import os
+import sys
+from collections import Counter
+from itertools import product
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dgh import _CACHE_HEADER, CsvDGH
+from engine import DisjointSet, Engine, Lattice
+
+
+_EXAMPLE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                            'example')
+"""
+Directory of the example tables and generalization files.
+"""
+
+_QI_NAMES = ['age', 'city_birth', 'zip_code']
+"""
+Names of the Quasi Identifiers of the example tables.
+"""
+
+
+def _dgh_path(attribute: str) -> str:
+
+    """
+    :param attribute:   Name of a Quasi Identifier attribute.
+    :return:            Path to its example generalization file.
+    """
+
+    return os.path.join(_EXAMPLE_DIR, '%s_generalization.csv' % attribute)
+
+
+@pytest.fixture(scope='module')
+def dghs() -> list:
+
+    """
+    DGHs of the Quasi Identifiers, parsed from the example generalization files.
+    """
+
+    return [CsvDGH(_dgh_path(attribute)) for attribute in _QI_NAMES]
+
+
+@pytest.fixture(scope='module')
+def sequences() -> list:
+
+    """
+    QI sequences of the rows of the example table with 100 rows.
+    """
+
+    with open(os.path.join(_EXAMPLE_DIR, 'db_100.csv'), newline='') as file:
+        rows = list(csv.DictReader(file))
+    return [tuple(row[attribute] for attribute in _QI_NAMES) for row in rows]
+
+
+def test_disjoint_set_union():
+
+    classes = DisjointSet()
+    elements = [classes.add() for _ in range(6)]
+    classes.union(elements[0], elements[1])
+    classes.union(elements[2], elements[3])
+    classes.union(elements[1], elements[3])
+
+    assert len(classes) == 6
+    assert len(set(map(classes.find, elements))) == 3
+    assert classes.find(elements[0]) == classes.find(elements[2])
+    assert classes.find(elements[4]) != classes.find(elements[5])
+    # Uniting two elements of the same set changes nothing:
+    assert classes.union(elements[0], elements[3]) == classes.find(elements[1])
+
+
+def test_engine_merges_classes(dghs, sequences):
+
+    engine = Engine(dghs, 3)
+    for sequence in sequences:
+        engine.add_row(sequence)
+    assert engine.count_classes() == len(set(sequences))
+
+    for attribute_idx in (2, 0, 2):
+        engine.generalize(attribute_idx)
+        # The merged classes are the ones with the same generalized values:
+        expected = Counter(tuple(dgh.generalize_to(value, 0, engine.gen_levels[i])
+                                 for i, (dgh, value) in enumerate(zip(dghs, sequence)))
+                           for sequence in sequences)
+        assert engine.count_classes() == len(expected)
+        assert Counter(dict((engine.decode(root), engine.counts[root])
+                            for root in engine.roots)) == expected
+        assert engine.non_anonymous == sum(count for count in expected.values() if count < 3)
+        # Every row is in the class with its generalized values:
+        assert [engine.decode(class_idx) for class_idx in engine.resolve()] == [
+            tuple(dgh.generalize_to(value, 0, engine.gen_levels[i])
+                  for i, (dgh, value) in enumerate(zip(dghs, sequence)))
+            for sequence in sequences]
+
+
+def _assert_same_dgh(dgh, expected):
+
+    assert dgh.gen_levels == expected.gen_levels
+    assert dgh.labels == expected.labels
+    assert dgh.codes == expected.codes
+    assert [list(codes) for codes in dgh.parent_codes] == \
+        [list(codes) for codes in expected.parent_codes]
+
+
+def test_dgh_cache_round_trip(dghs, tmp_path):
+
+    for attribute, expected in zip(_QI_NAMES, dghs):
+        CsvDGH(_dgh_path(attribute), cache_dir=str(tmp_path))
+        dgh = CsvDGH(_dgh_path(attribute), cache_dir=str(tmp_path))
+        # The second instance is loaded from the compiled file:
+        assert dgh._cache is not None
+        _assert_same_dgh(dgh, expected)
+        for value in expected.labels[0]:
+            assert dgh.generalize(value, 0) == expected.generalize(value, 0)
+    assert len(os.listdir(str(tmp_path))) == len(_QI_NAMES)
+
+
+def test_dgh_cache_rebuilt_if_corrupt(dghs, tmp_path):
+
+    path = _dgh_path('city_birth')
+    CsvDGH(path, cache_dir=str(tmp_path))
+    cache_path = os.path.join(str(tmp_path), os.listdir(str(tmp_path))[0])
+    # Keep the header, so that only the sections are corrupt:
+    with open(cache_path, 'r+b') as file:
+        file.seek(_CACHE_HEADER.size)
+        file.write(b'\xff' * 16)
+        file.truncate()
+
+    dgh = CsvDGH(path, cache_dir=str(tmp_path))
+    assert dgh._cache is None
+    _assert_same_dgh(dgh, dghs[_QI_NAMES.index('city_birth')])
+    # The compiled file is written again, and loaded by the next instance:
+    assert CsvDGH(path, cache_dir=str(tmp_path))._cache is not None
+
+
+@pytest.mark.parametrize('k', [2, 3, 10, 20])
+def test_lattice_finds_minimal_loss(dghs, sequences, k):
+
+    lattice = Lattice(dghs, k)
+    for sequence in sequences:
+        lattice.add_sequence(sequence)
+    plan = lattice.plan()
+
+    # Brute force: the discernibility loss of every k-anonymous node of the lattice:
+    losses = dict()
+    for node in product(*(range(len(dgh.parent_codes) + 1) for dgh in dghs)):
+        counts = Counter(tuple(dgh.generalize_to(value, 0, level)
+                               for dgh, value, level in zip(dghs, sequence, node))
+                         for sequence in sequences).values()
+        suppressed = sum(count for count in counts if count < k)
+        if suppressed <= k:
+            losses[node] = sum(count * count for count in counts if count >= k) + \
+                len(sequences) * suppressed
+
+    best = min(losses, key=lambda node: (losses[node], sum(node), node))
+    assert tuple(plan.gen_levels) == best
+    assert plan.loss == losses[best]
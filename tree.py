@@ -1,8 +1,12 @@
-from queue import Queue
+import sys
+from array import array
+from collections import deque
 
 
 class Node:
 
+    __slots__ = ('data', 'parent', 'children')
+
     def __init__(self, data):
 
         self.data = data
@@ -13,7 +17,14 @@ class Node:
         data.
         """
 
-    def add_child(self, child):
+    def _add_child(self, child):
+
+        """
+        Links a child to the node. The nodes of a tree must be added through Tree.insert, which
+        keeps the index of the tree valid.
+
+        :param child:   Node to link.
+        """
 
         child.parent = self
         self.children[child.data] = child
@@ -24,49 +35,68 @@ class Tree:
     def __init__(self, root: Node):
 
         self.root = root
+        self._index = None
+        """
+        List whose elements are, for each depth, a dictionary whose keys are the data of the nodes
+        on that depth and whose values are the first ones in breadth-first order. None if it has
+        to be built again.
+        """
 
     def bfs_search(self, data, depth=None):
 
         """
-        Searches for a node, given its data. The search starts from the root.
+        Searches for a node, given its data. The result is the same of a breadth-first search from
+        the root, but it's looked up in an index of the nodes on every depth.
 
         :param data:    Data of the node to find.
         :param depth:   Limits the search to nodes with the given depth.
         :return:        The node if it's found, None otherwise.
         """
 
-        visited, queue = set(), Queue()
-        # Each element of the queue is a couple (node, level):
-        queue.put((self.root, 0))
+        if self._index is None:
+            self._build_index()
 
-        while not queue.empty():
+        if depth is None:
+            # The first node in breadth-first order is the one on the lowest depth:
+            for nodes in self._index:
+                if data in nodes:
+                    return nodes[data]
+            return None
 
-            node, level = queue.get()
+        if depth < 0 or depth >= len(self._index):
+            return None
+        return self._index[depth].get(data)
 
-            if depth is not None and level > depth:
-                break
+    def _build_index(self):
 
-            if depth is None:
-                if node.data == data:
-                    return node
-            else:
-                if level == depth and node.data == data:
-                    return node
+        """
+        Visits the tree in breadth-first order and indexes the first node with each data on every
+        depth.
+        """
 
-            for child in node.children.values():
-                if child in visited:
-                    continue
-                queue.put((child, level + 1))
+        self._index = list()
+        # Note: a tree has no cycles, so there is no need to track the visited nodes. Each element
+        # of the queue is a couple (node, level):
+        queue = deque([(self.root, 0)])
 
-            visited.add(node)
+        while queue:
 
-        return None
+            node, level = queue.popleft()
+
+            if level == len(self._index):
+                self._index.append(dict())
+            self._index[level].setdefault(node.data, node)
+
+            for child in node.children.values():
+                queue.append((child, level + 1))
 
     def _bfs_insert(self, child: Node, parent: Node) -> bool:
 
         node = self.bfs_search(parent.data)
         if node is not None:
-            node.add_child(child)
+            node._add_child(child)
+            # The child may replace a node, and it may come before others in breadth-first order:
+            self._index = None
             return True
         else:
             return False
@@ -99,3 +129,248 @@ class Tree:
             return node.parent
         else:
             return None
+
+
+class ArrayNode:
+
+    __slots__ = ('tree', 'index')
+
+    def __init__(self, tree, index: int):
+
+        """
+        Represents a node of an array-backed tree, as a reference to its index. Instances are
+        created on demand, so they are not stored in the tree.
+
+        :param tree:    Tree which the node belongs to.
+        :param index:   Index of the node in the tree arrays.
+        """
+
+        self.tree = tree
+        self.index = index
+
+    @property
+    def data(self):
+
+        return self.tree.labels[self.index]
+
+    @property
+    def parent(self):
+
+        parent = self.tree.parents[self.index]
+        return ArrayNode(self.tree, parent) if parent >= 0 else None
+
+    @property
+    def children(self) -> dict:
+
+        """
+        Dictionary whose values are the node children and whose keys are the corresponding nodes
+        data.
+        """
+
+        return {self.tree.labels[child]: ArrayNode(self.tree, child)
+                for child in self.tree.children(self.index)}
+
+
+class ArrayTree:
+
+    __slots__ = ('labels', 'parents', 'levels', '_children', '_duplicates', '_index',
+                 '_child_lists')
+
+    def __init__(self, root_data):
+
+        """
+        Represents a tree as parallel arrays indexed by node, instead of linked Node objects. The
+        root has index 0 and every node is appended after its parent.
+
+        :param root_data:   Data of the root.
+        """
+
+        self.labels = [self._intern(root_data)]
+        """
+        List whose items are the data of each node. String data are interned, so that equal
+        values on different nodes share the same object.
+        """
+
+        self.parents = array('l', [-1])
+        """
+        Array whose items are the indices of the parent of each node, -1 for the root.
+        """
+
+        self.levels = array('H', [0])
+        """
+        Array whose items are the depths of each node, 0 for the root.
+        """
+
+        self._children = dict()
+        """
+        Dictionary whose keys are the nodes data and whose values are the indices of the first
+        inserted node with that data.
+        """
+
+        self._duplicates = dict()
+        """
+        Dictionary whose keys are couples (parent index, data) and whose values are the indices of
+        the nodes whose data is already in the children dictionary under another parent.
+        """
+
+        self._index = None
+        """
+        List whose elements are, for each depth, a dictionary whose keys are the data of the nodes
+        on that depth and whose values are the indices of the first one in breadth-first order.
+        None if it has to be built again.
+        """
+
+        self._child_lists = None
+        """
+        List whose elements are, for each node, the list of the indices of its children in
+        insertion order. It's built along with the index.
+        """
+
+    def __len__(self):
+
+        return len(self.labels)
+
+    @property
+    def root(self) -> ArrayNode:
+
+        return ArrayNode(self, 0)
+
+    def children(self, index: int) -> list:
+
+        """
+        Gets the children of a node.
+
+        :param index:   Index of the node.
+        :return:        List of the indices of the node children, in insertion order. It's the
+                        list kept by the tree, so it must not be modified.
+        """
+
+        if self._index is None:
+            self._build_index()
+
+        return self._child_lists[index]
+
+    def add_child(self, data, parent: int) -> int:
+
+        """
+        Adds a child to a node, unless it already has a child with the same data.
+
+        :param data:    Data of the child.
+        :param parent:  Index of the parent node.
+        :return:        Index of the child.
+        """
+
+        child = self._children.get(data)
+        if child is not None and self.parents[child] != parent:
+            child = self._duplicates.get((parent, data))
+
+        if child is None:
+            child = len(self.labels)
+            data = self._intern(data)
+            self.labels.append(data)
+            self.parents.append(parent)
+            self.levels.append(self.levels[parent] + 1)
+            if data not in self._children:
+                self._children[data] = child
+            else:
+                self._duplicates[(parent, data)] = child
+            self._index = None
+
+        return child
+
+    def add_path(self, values) -> bool:
+
+        """
+        Adds a path of nodes below the root, creating only the missing ones.
+
+        :param values:  Iterable of the data of the nodes, ordered from parent to child.
+        :return:        True if a node has been inserted, False otherwise.
+        """
+
+        size = len(self.labels)
+        node = 0
+        for value in values:
+            node = self.add_child(value, node)
+        return len(self.labels) > size
+
+    def bfs_search(self, data, depth=None):
+
+        """
+        Searches for a node, given its data. The result is the same of a breadth-first search from
+        the root, but it's looked up in an index.
+
+        :param data:    Data of the node to find.
+        :param depth:   Limits the search to nodes with the given depth.
+        :return:        The node if it's found, None otherwise.
+        """
+
+        if self._index is None:
+            self._build_index()
+
+        if depth is None:
+            # The first node in breadth-first order is the one on the lowest depth:
+            for nodes in self._index:
+                if data in nodes:
+                    return ArrayNode(self, nodes[data])
+            return None
+
+        if depth < 0 or depth >= len(self._index) or data not in self._index[depth]:
+            return None
+        return ArrayNode(self, self._index[depth][data])
+
+    def insert(self, data, parent_data) -> bool:
+
+        """
+        Inserts a node given the data of its parent. Note: insertion is done on the first node with
+        the same data as the given parent.
+
+        :param data:        Data of the node to insert.
+        :param parent_data: Data of the parent node.
+        :return:            True if the node has been inserted, False otherwise.
+        """
+
+        parent = self.bfs_search(parent_data)
+        if parent is None:
+            return False
+        size = len(self.labels)
+        self.add_child(data, parent.index)
+        return len(self.labels) > size
+
+    def parent(self, data):
+
+        """
+        Gets the parent of a node, given the node data.
+
+        :param data:    Data of the node to find.
+        :return:        Parent node if found, None otherwise.
+        """
+
+        node = self.bfs_search(data)
+
+        if node is not None:
+            return node.parent
+        else:
+            return None
+
+    def _build_index(self):
+
+        """
+        Lists the children of every node, then visits the tree in breadth-first order and indexes
+        the first node with each data on every depth.
+        """
+
+        self._child_lists = children = [list() for _ in self.labels]
+        for child in range(1, len(self.labels)):
+            children[self.parents[child]].append(child)
+
+        self._index = [dict() for _ in range(max(self.levels) + 1)]
+        queue = deque([0])
+        while queue:
+            node = queue.popleft()
+            self._index[self.levels[node]].setdefault(self.labels[node], node)
+            queue.extend(children[node])
+
+    @staticmethod
+    def _intern(data):
+
+        return sys.intern(data) if type(data) is str else data